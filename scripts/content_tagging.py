@@ -1,128 +1,204 @@
 # content_tagging.py
 
+import os
+
 import pandas as pd
+import numpy as np
+
+# Mapping of content categories to their events
+CONTENT_CATEGORIES = {
+    'Sexual Violence and Abuse': [
+        'stalking', 'abused forgives abuser', 'abused becomes abuser', 'gaslighting abuse with belt',
+        'women brutalized for spectacle', 'domestic violence', 'rape mentions', 'sexual assault',
+        'sexual assault on men is a joke', 'onscreen rape', 'women slapped', 'sexualized minor',
+        'kidnapping', 'cheating', 'incarceration', 'BDSM', 'being watched', 'large age gap',
+        'lose virginity', 'sexual objectification', 'incest', 'sexual content', 'bestiality'
+    ],
+    'Horror and Supernatural': [
+        'non-human death', 'ghosts', 'jump scares', 'demonic possession', 'shaky cam',
+        'sudden loud noises', 'screaming', 'demons or Hell', 'blood or gore', 'being watched',
+        'self-sacrifice'
+    ],
+    'Physical Violence': [
+        'abuse with belt', 'women brutalized for spectacle', 'domestic violence', 'held under water',
+        'beaten up by bully', 'restraints', 'sexual assault', 'mouth covering', 'onscreen rape',
+        'women slapped', 'hand damage', 'dislocations', 'throat mutilation', 'choking', 'decapitation',
+        'cannibalism', 'crushed to death', 'chokings', 'people being burned alive', 'buried alive',
+        'amputation', 'heads getting squashed', 'bones breaking', 'torture', 'falling down stairs',
+        'falling deaths', 'eye mutilation', 'stabbings', 'excessive gore', 'hangings', 'kidnapping',
+        'audio gore', 'needles or syringes are used', 'self harming', 'people getting hit by cars',
+        'drownings', 'blood or gore'
+    ],
+    'Animal Abuse': [
+        'dogs dying', 'animals harmed during making', 'animals (besides dog/cat/horse) dying',
+        'animal abuse', 'dog fighting', 'dead animals', 'sad animals', 'harmed rabbits',
+        'cats dying', 'pets die', 'dragons dying', 'horses dying', 'abandoned animals',
+        'non-human death', 'bestiality'
+    ],
+    'Medical and Health': [
+        'restraints amputation', 'Achilles tendon injury', 'asphyxiation', 'genital trauma/mutilation',
+        'unconscious', 'bones breaking', 'seizures', 'overdose', 'vomiting', 'needles or syringes are used',
+        'electro-therapy', 'hospital scenes', 'menstruation', 'cancer', 'mental institutions',
+        'self harming', 'violent mentally ill person', 'dissociation / depersonalization / derealization',
+        'D.I.D. misrepresentation', 'autism abuse', 'suicide attempts', 'mental illness', 'anxiety attacks',
+        'ABA therapy', 'suicide threats', 'body dysphoria', 'body dysmorphia', 'eating disorders',
+        'people dying by suicide', 'PTSD', 'meltdowns', 'stillbirths', 'miscarriages', 'babies/unborn',
+        'childbirth', 'abortions', 'pregnant people deaths', 'strokes', 'chronic illnesses',
+        "dementia/Alzheimer's", 'terminal illness'
+    ],
+    'Child Abuse': [
+        'child abuse', 'abusive parents', 'pedophilia', 'infant abduction', 'sexualized minor',
+        'kids dying', 'parents dying', 'dear toy destruction', 'crying babies', 'large age gap'
+    ],
+    'Death and Grief': [
+        'abusive parents', 'kids dying', 'self-sacrifice', 'non-human death', 'someone dies',
+        'major character dies', 'parents dying', 'family dies', 'cancer', 'suicide attempts',
+        'people dying by suicide', 'strokes', 'chronic illnesses', 'terminal illness', 'ghosts', '9/11'
+    ],
+    'LGBTQ+ Phobia': [
+        'sexual assault', 'sexual assault on men is a joke', 'trans person depicted predatorily',
+        'deadnaming / birthnaming', 'LGBT+ person outed', 'transphobic slurs', 'bisexual cheating',
+        'homophobic slurs', 'man in a dress jokes', 'misgendering', 'LGBT people dying', 'male crying ridicule'
+    ],
+    'Systemic Issues and Social Injustice': [
+        'beaten up by bully', 'disabled played by able-bodied', 'R-slur', 'copaganda', 'incarceration',
+        'trans person depicted predatorily', 'homelessness', 'anti-abortion', 'religion discussed',
+        'antisemitism', 'n-word usage', 'black guy dies first', 'hate speech', 'minority misrepresentation',
+        'blackface'
+    ],
+    'Fear and Anxiety': [
+        'snakes', 'spiders', 'bugs', 'stalking', 'held under water', 'shaving or cutting', 'bedbugs',
+        'family dies', 'bodies of water', 'clowns', 'trypophobia', 'razors', 'mannequins', 'vomiting',
+        'needles or syringes are used', 'being watched', 'aphobia', 'alligators/crocodiles', 'sharks',
+        'people being burned alive', 'buried alive', 'claustrophobic scenes'
+    ],
+    'Racism': [
+        'copaganda', 'n-word usage', 'black guy dies first', 'hate speech', 'minority misrepresentation', 'blackface'
+    ],
+    'Sensory Sensitivity': [
+        'bones breaking', 'jump scares', 'audio gore', 'underwater scenes', 'sudden loud noises',
+        'shaky cam', 'crying babies', 'screaming', 'flashing lights or images', 'car honk / tire screech',
+        'obscene language/gestures', 'being watched', 'stalking', 'claustrophobic scenes'
+    ],
+    'Gore and Body Horror': [
+        'hand damage', 'dislocations', 'throat mutilation', 'choking', 'decapitation', 'cannibalism',
+        'crushed to death', 'people being burned alive', 'buried alive', 'body horror', 'amputation',
+        'heads getting squashed', 'shaving or cutting', 'genital trauma/mutilation', 'bones breaking',
+        'torture', 'falling down stairs', 'falling deaths', 'eye mutilation', 'stabbings', 'excessive gore',
+        'hangings', 'someone is eaten', 'audio gore', 'needles or syringes are used', 'self harming',
+        'blood or gore', 'drownings', 'people getting hit by cars', 'gun violence'
+    ],
+    'Sexism': [
+        'women brutalized for spectacle', 'domestic violence', 'sexual assault', 'onscreen rape',
+        'women slapped', 'anti-abortion', 'stalked', 'being watched', 'large age gap'
+    ],
+    'Mental Health and Ableism': [
+        'seizures', 'disabled played by able-bodied', 'R-slur', 'electro-therapy', 'mental institutions',
+        'self harming', 'autism misrepresented', 'violent mentally ill person', 'dissociation / depersonalization / derealization',
+        'D.I.D. misrepresentation', 'autism abuse', 'suicide attempts', 'reality unhinged', 'mental illness',
+        'misophonia', 'anxiety attacks', 'ABA therapy', 'suicide threats', 'body dysphoria', 'body dysmorphia',
+        'claustrophobic scenes', 'eating disorders', 'people dying by suicide', 'PTSD', 'meltdowns', 'ableism',
+        "dementia/Alzheimer's"
+    ],
+    'Addiction and Substance Abuse': [
+        'alcohol abuse', 'addiction', 'drug use', 'druggings', 'overdose', 'needles or syringes are used'
+    ],
+    'Catastrophes and Accidents': [
+        'car crashes', 'planes crashing', 'people getting hit by cars', 'drownings', 'nuclear explosions',
+        'gun violence', '9/11', 'copaganda', 'incarceration', 'falling down stairs', 'falling deaths'
+    ],
+    'Body Shaming and Fatphobia': [
+        'fat jokes', 'eating disorders', 'fat suits', 'vomiting', 'mental institutions', 'self harming',
+        'body dysphoria', 'body dysmorphia'
+    ],
+    'Plot Warnings and Spoilers': [
+        'major character dies', 'leave without goodbye', 'jump scares', 'fourth wall', 'Santa (et al) spoilers',
+        'end credit scenes', 'sad endings'
+    ]
+}
+
+CATEGORY_NAMES = list(CONTENT_CATEGORIES)
 
-def assign_content_tags(df):
+
+def _compile_event_masks(categories):
     """
-    Adds a 'content_tags' column to the DataFrame based on matching values in the 'events' column.
+    Builds the inverted index event -> category bitmask (bit i set for the i-th category).
     
     """
-    # Define the mapping of categories to their events
-    categories = {
-        'Sexual Violence and Abuse': [
-            'stalking', 'abused forgives abuser', 'abused becomes abuser', 'gaslighting abuse with belt',
-            'women brutalized for spectacle', 'domestic violence', 'rape mentions', 'sexual assault',
-            'sexual assault on men is a joke', 'onscreen rape', 'women slapped', 'sexualized minor',
-            'kidnapping', 'cheating', 'incarceration', 'BDSM', 'being watched', 'large age gap',
-            'lose virginity', 'sexual objectification', 'incest', 'sexual content', 'bestiality'
-        ],
-        'Horror and Supernatural': [
-            'non-human death', 'ghosts', 'jump scares', 'demonic possession', 'shaky cam',
-            'sudden loud noises', 'screaming', 'demons or Hell', 'blood or gore', 'being watched',
-            'self-sacrifice'
-        ],
-        'Physical Violence': [
-            'abuse with belt', 'women brutalized for spectacle', 'domestic violence', 'held under water',
-            'beaten up by bully', 'restraints', 'sexual assault', 'mouth covering', 'onscreen rape',
-            'women slapped', 'hand damage', 'dislocations', 'throat mutilation', 'choking', 'decapitation',
-            'cannibalism', 'crushed to death', 'chokings', 'people being burned alive', 'buried alive',
-            'amputation', 'heads getting squashed', 'bones breaking', 'torture', 'falling down stairs',
-            'falling deaths', 'eye mutilation', 'stabbings', 'excessive gore', 'hangings', 'kidnapping',
-            'audio gore', 'needles or syringes are used', 'self harming', 'people getting hit by cars',
-            'drownings', 'blood or gore'
-        ],
-        'Animal Abuse': [
-            'dogs dying', 'animals harmed during making', 'animals (besides dog/cat/horse) dying',
-            'animal abuse', 'dog fighting', 'dead animals', 'sad animals', 'harmed rabbits',
-            'cats dying', 'pets die', 'dragons dying', 'horses dying', 'abandoned animals',
-            'non-human death', 'bestiality'
-        ],
-        'Medical and Health': [
-            'restraints amputation', 'Achilles tendon injury', 'asphyxiation', 'genital trauma/mutilation',
-            'unconscious', 'bones breaking', 'seizures', 'overdose', 'vomiting', 'needles or syringes are used',
-            'electro-therapy', 'hospital scenes', 'menstruation', 'cancer', 'mental institutions',
-            'self harming', 'violent mentally ill person', 'dissociation / depersonalization / derealization',
-            'D.I.D. misrepresentation', 'autism abuse', 'suicide attempts', 'mental illness', 'anxiety attacks',
-            'ABA therapy', 'suicide threats', 'body dysphoria', 'body dysmorphia', 'eating disorders',
-            'people dying by suicide', 'PTSD', 'meltdowns', 'stillbirths', 'miscarriages', 'babies/unborn',
-            'childbirth', 'abortions', 'pregnant people deaths', 'strokes', 'chronic illnesses',
-            "dementia/Alzheimer's", 'terminal illness'
-        ],
-        'Child Abuse': [
-            'child abuse', 'abusive parents', 'pedophilia', 'infant abduction', 'sexualized minor',
-            'kids dying', 'parents dying', 'dear toy destruction', 'crying babies', 'large age gap'
-        ],
-        'Death and Grief': [
-            'abusive parents', 'kids dying', 'self-sacrifice', 'non-human death', 'someone dies',
-            'major character dies', 'parents dying', 'family dies', 'cancer', 'suicide attempts',
-            'people dying by suicide', 'strokes', 'chronic illnesses', 'terminal illness', 'ghosts', '9/11'
-        ],
-        'LGBTQ+ Phobia': [
-            'sexual assault', 'sexual assault on men is a joke', 'trans person depicted predatorily',
-            'deadnaming / birthnaming', 'LGBT+ person outed', 'transphobic slurs', 'bisexual cheating',
-            'homophobic slurs', 'man in a dress jokes', 'misgendering', 'LGBT people dying', 'male crying ridicule'
-        ],
-        'Systemic Issues and Social Injustice': [
-            'beaten up by bully', 'disabled played by able-bodied', 'R-slur', 'copaganda', 'incarceration',
-            'trans person depicted predatorily', 'homelessness', 'anti-abortion', 'religion discussed',
-            'antisemitism', 'n-word usage', 'black guy dies first', 'hate speech', 'minority misrepresentation',
-            'blackface'
-        ],
-        'Fear and Anxiety': [
-            'snakes', 'spiders', 'bugs', 'stalking', 'held under water', 'shaving or cutting', 'bedbugs',
-            'family dies', 'bodies of water', 'clowns', 'trypophobia', 'razors', 'mannequins', 'vomiting',
-            'needles or syringes are used', 'being watched', 'aphobia', 'alligators/crocodiles', 'sharks',
-            'people being burned alive', 'buried alive', 'claustrophobic scenes'
-        ],
-        'Racism': [
-            'copaganda', 'n-word usage', 'black guy dies first', 'hate speech', 'minority misrepresentation', 'blackface'
-        ],
-        'Sensory Sensitivity': [
-            'bones breaking', 'jump scares', 'audio gore', 'underwater scenes', 'sudden loud noises',
-            'shaky cam', 'crying babies', 'screaming', 'flashing lights or images', 'car honk / tire screech',
-            'obscene language/gestures', 'being watched', 'stalking', 'claustrophobic scenes'
-        ],
-        'Gore and Body Horror': [
-            'hand damage', 'dislocations', 'throat mutilation', 'choking', 'decapitation', 'cannibalism',
-            'crushed to death', 'people being burned alive', 'buried alive', 'body horror', 'amputation',
-            'heads getting squashed', 'shaving or cutting', 'genital trauma/mutilation', 'bones breaking',
-            'torture', 'falling down stairs', 'falling deaths', 'eye mutilation', 'stabbings', 'excessive gore',
-            'hangings', 'someone is eaten', 'audio gore', 'needles or syringes are used', 'self harming',
-            'blood or gore', 'drownings', 'people getting hit by cars', 'gun violence'
-        ],
-        'Sexism': [
-            'women brutalized for spectacle', 'domestic violence', 'sexual assault', 'onscreen rape',
-            'women slapped', 'anti-abortion', 'stalked', 'being watched', 'large age gap'
-        ],
-        'Mental Health and Ableism': [
-            'seizures', 'disabled played by able-bodied', 'R-slur', 'electro-therapy', 'mental institutions',
-            'self harming', 'autism misrepresented', 'violent mentally ill person', 'dissociation / depersonalization / derealization',
-            'D.I.D. misrepresentation', 'autism abuse', 'suicide attempts', 'reality unhinged', 'mental illness',
-            'misophonia', 'anxiety attacks', 'ABA therapy', 'suicide threats', 'body dysphoria', 'body dysmorphia',
-            'claustrophobic scenes', 'eating disorders', 'people dying by suicide', 'PTSD', 'meltdowns', 'ableism',
-            "dementia/Alzheimer's"
-        ],
-        'Addiction and Substance Abuse': [
-            'alcohol abuse', 'addiction', 'drug use', 'druggings', 'overdose', 'needles or syringes are used'
-        ],
-        'Catastrophes and Accidents': [
-            'car crashes', 'planes crashing', 'people getting hit by cars', 'drownings', 'nuclear explosions',
-            'gun violence', '9/11', 'copaganda', 'incarceration', 'falling down stairs', 'falling deaths'
-        ],
-        'Body Shaming and Fatphobia': [
-            'fat jokes', 'eating disorders', 'fat suits', 'vomiting', 'mental institutions', 'self harming',
-            'body dysphoria', 'body dysmorphia'
-        ],
-        'Plot Warnings and Spoilers': [
-            'major character dies', 'leave without goodbye', 'jump scares', 'fourth wall', 'Santa (et al) spoilers',
-            'end credit scenes', 'sad endings'
-        ]
+    if len(categories) > 32:
+        raise ValueError('At most 32 categories fit in a uint32 bitmask.')
+
+    event_masks = {}
+    for bit, events in enumerate(categories.values()):
+        for event in events:
+            event_masks[event] = event_masks.get(event, 0) | (1 << bit)
+    return event_masks
+
+
+EVENT_MASKS = _compile_event_masks(CONTENT_CATEGORIES)
+
+
+def content_tag_masks(events, separator=','):
+    """
+    Returns a uint32 Series with one category bitmask per row of an 'events' Series,
+    computed in a single vectorized pass. Non-string rows get 0.
+    
+    """
+    exploded = events.reset_index(drop=True).astype(object).str.split(separator).explode().dropna()
+    masks = exploded.str.strip().map(EVENT_MASKS).fillna(0).to_numpy(dtype='uint32')
+
+    result = np.zeros(len(events), dtype='uint32')
+    np.bitwise_or.at(result, exploded.index.to_numpy(dtype='int64'), masks)
+
+    return pd.Series(result, index=events.index, name='content_tag_mask')
+
+
+def content_tag_matrix(events, separator=','):
+    """
+    Returns a boolean DataFrame (rows x categories) marking the content categories of each row.
+    
+    """
+    masks = content_tag_masks(events, separator).to_numpy()
+    bits = np.uint32(1) << np.arange(len(CATEGORY_NAMES), dtype='uint32')
+    return pd.DataFrame((masks[:, None] & bits) != 0, index=events.index, columns=CATEGORY_NAMES)
+
+
+def masks_to_tags(masks):
+    """
+    Converts category bitmasks back to comma-joined category names, decoding each distinct mask once.
+    
+    """
+    names = {
+        mask: ', '.join(name for bit, name in enumerate(CATEGORY_NAMES) if mask & (1 << bit))
+        for mask in pd.unique(masks)
     }
+    return masks.map(names)
+
+
+def assign_content_tags(df, as_matrix=False):
+    """
+    Adds a 'content_tags' column to the DataFrame based on matching values in the 'events' column.
+    With as_matrix=True, returns the boolean rows x categories matrix instead.
+    
+    """
+    if as_matrix:
+        return content_tag_matrix(df['events'])
 
-    df['content_tags'] = df['events'].apply(
-        lambda events: ", ".join([
-            category for category, tags in categories.items() if any(str(event).strip() in tags for event in str(events).split(","))
-            ]) if isinstance(events, str) else ""  # Handle non-string values
-        )
+    masks = content_tag_masks(df['events'])
+    df['content_tags'] = masks_to_tags(masks).astype(object)  # '' for non-string or unmatched events
     
     return df
+
+
+def tag_file(input_path, output_path):
+    """
+    Reads a table with an 'events' column, adds 'content_tags' and writes it to output_path.
+
+    """
+    df = assign_content_tags(pd.read_csv(input_path))
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    df.to_csv(output_path, index=False)
+    return output_path
@@ -0,0 +1,315 @@
+# doesthedog_client.py
+# Concurrent, rate-limited client for the doesthedogdie.com search API.
+
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+
+import httpx
+import pandas as pd
+from dotenv import load_dotenv
+
+import doesthedog_store
+
+sys.path.append('./utils')
+import title_matching
+
+
+BASE_URL = 'https://www.doesthedogdie.com/dddsearch'
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+# ------------------------------
+# Response Parsing Functions
+# ------------------------------
+
+def extract_topics(stats_str):
+    """
+    Returns the comma-joined ids of the topics where 'definitelyYes' votes outnumber 'definitelyNo'.
+
+    """
+    try:
+        stats = json.loads(stats_str) # stats is a string, so we parse it into a dictionary
+    except (json.JSONDecodeError, TypeError):
+        print('Error decoding stats:', stats_str)
+        return ''
+
+    if 'topics' not in stats:
+        print("No 'topics' field in response:", stats)
+        return ''
+
+    topics_of_interest = [
+        str(topic_id) for topic_id, data in stats['topics'].items()
+        if int(data['definitelyYes']) > int(data['definitelyNo'])
+    ]
+    return ','.join(topics_of_interest)
+
+
+def parse_search_response(payload):
+    """
+    Returns the topics, doesthedog id, release year and raw stats of the first search result,
+    or None values if nothing was found.
+
+    """
+    items = payload.get('items', [])
+    if not items:
+        return {'topics': None, 'doesthedog_id': None, 'release_year': None, 'stats': None}
+    stats = items[0].get('stats', '{}')
+    release_year = str(items[0].get('releaseYear') or '')
+    return {
+        'topics': extract_topics(stats),
+        'doesthedog_id': items[0].get('id'),
+        'release_year': int(release_year) if release_year.isdigit() else None,
+        'stats': stats if isinstance(stats, str) else json.dumps(stats),
+    }
+
+
+# ------------------------------
+# Rate Limiting
+# ------------------------------
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter: allows 'rate' requests per second on average, with bursts up to 'capacity'.
+
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# ------------------------------
+# Checkpointing
+# ------------------------------
+
+def load_checkpoint(path):
+    """
+    Reads a JSON-lines checkpoint into a dictionary {title: record}. A missing file gives an empty dictionary.
+    Only successful (status 200) records count as done, so failed lookups are fetched again.
+
+    """
+    records = {}
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    if record.get('status') == 200:
+                        records[record['title']] = record
+    return records
+
+
+def _append_checkpoint(path, record):
+    record = {key: value for key, value in record.items() if key != 'stats'} # raw stats live in the store only
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write(json.dumps(record) + '\n')
+
+
+# ------------------------------
+# Local Resolution
+# ------------------------------
+
+def resolve_from_store(store, titles, years, ttl=None, min_score=0.9, year_tolerance=0):
+    """
+    Links titles to stored search hits by fuzzy title match (title_matching.best_matches),
+    so a title spelled slightly differently from a stored one reuses its result instead of
+    sending a new search request. Only hits released within 'year_tolerance' years of the title
+    are compared, so sequels with near-identical titles (Rocky II / Rocky III) are not linked;
+    titles without a year and hits stored without one are never matched.
+    Returns {title: record} for the titles that matched.
+
+    """
+    hits = doesthedog_store.records_frame(store, ttl=ttl)
+    if hits.empty or not titles:
+        return {}
+
+    left = pd.DataFrame({'title': titles, 'release_year': years})
+    matches = title_matching.best_matches(
+        left, hits, min_score=min_score, left_year='release_year', right_year='release_year',
+        year_tolerance=year_tolerance
+    )
+    return {
+        left.at[left_index, 'title']: {
+            'title': left.at[left_index, 'title'], 'status': 200,
+            'topics': hits.at[right_index, 'topics'], 'doesthedog_id': int(hits.at[right_index, 'doesthedog_id']),
+            'release_year': int(hits.at[right_index, 'release_year']),
+        }
+        for left_index, right_index in zip(matches['left_index'], matches['right_index'])
+    }
+
+
+# ------------------------------
+# Fetching Functions
+# ------------------------------
+
+async def fetch_title(client, title, bucket, semaphore, base_url=BASE_URL, max_retries=5, backoff=1.0):
+    """
+    Searches one title, retrying with exponential backoff (and Retry-After when given) on 429/5xx
+    network errors and malformed response bodies. Returns a record with 'title', 'status', 'topics' and 'doesthedog_id',
+    or None if the request kept failing. A response that cannot be parsed gives status 'parse error'.
+
+    """
+    for attempt in range(max_retries + 1):
+        async with semaphore:
+            await bucket.acquire()
+            try:
+                response = await client.get(base_url, params={'q': title})
+            except httpx.TransportError as error:
+                response, status = None, repr(error)
+            else:
+                status = response.status_code
+
+        if response is not None and status == 200:
+            try:
+                payload = response.json()
+            except ValueError as error: # malformed body: retry like a network error
+                response, status = None, repr(error)
+            else:
+                try:
+                    return {'title': title, 'status': status, **parse_search_response(payload)}
+                except (AttributeError, KeyError, TypeError, ValueError) as error: # unexpected payload shape
+                    print(f'Could not parse response for {title}: {error!r}')
+                    return {'title': title, 'status': 'parse error', 'topics': None, 'doesthedog_id': None, 'stats': None}
+
+        if response is not None and status not in RETRY_STATUSES:
+            print(f'Error with request for {title}: {status}')
+            return {'title': title, 'status': status, 'topics': None, 'doesthedog_id': None, 'stats': None}
+
+        if attempt < max_retries:
+            retry_after = response.headers.get('Retry-After') if response is not None else None
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else backoff * 2 ** attempt
+            await asyncio.sleep(delay + random.uniform(0, backoff))
+
+    print(f'Giving up on {title} after {max_retries + 1} attempts: {status}')
+    return None
+
+
+async def fetch_titles(
+    titles, api_key=None, base_url=BASE_URL, rate=2.0, max_concurrency=8,
+    max_retries=5, backoff=1.0, checkpoint_path=None, timeout=30.0, store=None, ttl=None,
+    years=None, resolve_locally=False, min_score=0.9, year_tolerance=0
+):
+    """
+    Fetches doesthedogdie results for many titles concurrently over one pooled HTTP connection set,
+    limited to 'rate' requests per second and 'max_concurrency' requests in flight.
+    Successful results are appended to the JSON-lines checkpoint as they arrive, and titles already
+    in it are skipped, so an interrupted run resumes where it stopped. With a response store
+    (doesthedog_store.open_store) only titles missing from it, or older than 'ttl' seconds,
+    hit the network, and new results are written back. Opt in with resolve_locally=True and the
+    release 'years' (aligned with 'titles') to first fuzzy-match titles missing from the store
+    against its hits of the same years (resolve_from_store); only those left unmatched are searched.
+    Returns {title: record}.
+    In a notebook, await this coroutine directly; elsewhere use fetch_topics.
+
+    """
+    if api_key is None:
+        load_dotenv()
+        api_key = os.getenv('API_KEY_DOESTHEDOGDIE')
+
+    titles = list(titles)
+    if resolve_locally and years is None:
+        raise ValueError('resolve_locally=True needs the release years of the titles.')
+    records = load_checkpoint(checkpoint_path)
+    if store is not None:
+        records.update(doesthedog_store.get_records(store, titles, ttl=ttl))
+    pending = [title for title in dict.fromkeys(titles) if isinstance(title, str) and title not in records]
+    if store is not None and resolve_locally and pending:
+        title_years = dict(zip(titles, years))
+        local = resolve_from_store(
+            store, pending, [title_years[title] for title in pending],
+            ttl=ttl, min_score=min_score, year_tolerance=year_tolerance
+        )
+        records.update(local)
+        pending = [title for title in pending if title not in records]
+
+    bucket = TokenBucket(rate)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    headers = {'Accept': 'application/json', 'X-API-KEY': api_key or ''}
+    limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+
+    async with httpx.AsyncClient(headers=headers, limits=limits, timeout=timeout) as client:
+        tasks = [
+            asyncio.create_task(fetch_title(client, title, bucket, semaphore, base_url, max_retries, backoff))
+            for title in pending
+        ]
+        try:
+            for task in asyncio.as_completed(tasks):
+                record = await task
+                if record is None:
+                    continue
+                records[record['title']] = record
+                if record['status'] != 200: # errors (e.g. 401, 404) are returned but never persisted
+                    continue
+                if checkpoint_path:
+                    _append_checkpoint(checkpoint_path, record)
+                if store is not None:
+                    doesthedog_store.put_records(store, [record])
+        finally:
+            for task in tasks: # don't leave requests running on a closed client
+                task.cancel()
+
+    return records
+
+
+def apply_records(df, records, title_column='title'):
+    """
+    Fills 'topics' and 'doesthedog_id' columns of the DataFrame from fetched records, matched by title.
+
+    """
+    df['topics'] = df[title_column].map(lambda title: records.get(title, {}).get('topics'))
+    df['doesthedog_id'] = df[title_column].map(lambda title: records.get(title, {}).get('doesthedog_id'))
+    return df
+
+
+def fetch_topics(df, title_column='title', year_column=None, **kwargs):
+    """
+    Fetches doesthedogdie topics for every title in the DataFrame and adds 'topics' and 'doesthedog_id'.
+    Keyword arguments go to fetch_titles (rate, max_concurrency, checkpoint_path, base_url, ...);
+    'year_column' supplies the release years used by resolve_locally=True.
+
+    """
+    if year_column is not None:
+        kwargs['years'] = df[year_column].tolist()
+    records = asyncio.run(fetch_titles(df[title_column].tolist(), **kwargs))
+    return apply_records(df, records, title_column)
+
+
+def fetch_file(film_path, output_path, store_path=doesthedog_store.STORE_PATH, title_column='title', **kwargs):
+    """
+    Reads a film table, fetches doesthedogdie topics for its titles through the response store
+    (only titles missing from it hit the network) and writes the table with 'topics' and
+    'doesthedog_id' added. Keyword arguments go to fetch_titles.
+
+    """
+    df = pd.read_csv(film_path)
+    store = doesthedog_store.open_store(store_path)
+    try:
+        df = fetch_topics(df, title_column=title_column, store=store, **kwargs)
+    finally:
+        store.close()
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    df.to_csv(output_path, index=False)
+    return output_path
@@ -0,0 +1,167 @@
+# doesthedog_store.py
+# Local SQLite store of doesthedogdie search results, keyed by normalized title and doesthedog id.
+
+
+import os
+import time
+import zlib
+import sqlite3
+
+import pandas as pd
+
+
+STORE_PATH = './data/local/cache/doesthedog_responses.sqlite'
+
+
+def normalize_title(title):
+    """
+    Normalizes a title for lookups: lowercase with whitespace runs collapsed.
+
+    """
+    return ' '.join(title.lower().split())
+
+
+def open_store(path=STORE_PATH):
+    """
+    Opens (or creates) the response store at the given path and returns the connection.
+
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(path)
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS responses ('
+        'title_key TEXT PRIMARY KEY, title TEXT, doesthedog_id INTEGER, topics TEXT, '
+        'status INTEGER, stats BLOB, fetched_at REAL, release_year INTEGER'
+        ') WITHOUT ROWID'
+    )
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(responses)')]
+    if 'release_year' not in columns: # stores created before release years were kept
+        conn.execute('ALTER TABLE responses ADD COLUMN release_year INTEGER')
+    conn.execute('CREATE INDEX IF NOT EXISTS responses_id ON responses (doesthedog_id)')
+    conn.commit()
+    return conn
+
+
+def put_records(conn, records, fetched_at=None):
+    """
+    Writes fetched records (dictionaries with 'title', 'status', 'topics', 'doesthedog_id',
+    optionally 'release_year' and the raw 'stats' string, stored compressed) to the store.
+    Failed lookups (any status other than 200) are not stored, so they are fetched again.
+
+    """
+    fetched_at = time.time() if fetched_at is None else fetched_at
+    rows = [
+        (
+            normalize_title(record['title']), record['title'], record.get('doesthedog_id'),
+            record.get('topics'), record.get('status'),
+            zlib.compress(record['stats'].encode('utf-8')) if record.get('stats') else None,
+            fetched_at, record.get('release_year'),
+        )
+        for record in records if record.get('status') == 200
+    ]
+    conn.executemany('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+    conn.commit()
+
+
+def _row_to_record(row):
+    title, doesthedog_id, topics, status, stats, fetched_at, release_year = row
+    return {
+        'title': title, 'doesthedog_id': doesthedog_id, 'topics': topics, 'status': status,
+        'stats': zlib.decompress(stats).decode('utf-8') if stats is not None else None,
+        'fetched_at': fetched_at, 'release_year': release_year,
+    }
+
+
+def get_records(conn, titles, ttl=None):
+    """
+    Returns {title: record} for the titles found in the store. With 'ttl' (seconds),
+    entries fetched longer ago than that are treated as missing, as are failed lookups.
+
+    """
+    keys = {}
+    for title in titles:
+        if isinstance(title, str):
+            keys.setdefault(normalize_title(title), []).append(title)
+
+    oldest = time.time() - ttl if ttl is not None else float('-inf')
+    found = {}
+    key_list = list(keys)
+    for start in range(0, len(key_list), 900): # stay below SQLite's bound-parameter limit
+        batch = key_list[start:start + 900]
+        placeholders = ', '.join('?' * len(batch))
+        rows = conn.execute(
+            'SELECT title_key, title, doesthedog_id, topics, status, stats, fetched_at, release_year '
+            f'FROM responses WHERE title_key IN ({placeholders}) AND status = 200 AND fetched_at >= ?',
+            (*batch, oldest)
+        )
+        for title_key, *row in rows:
+            record = _row_to_record(row)
+            for title in keys[title_key]:
+                found[title] = {**record, 'title': title}
+    return found
+
+
+def get_records_by_id(conn, doesthedog_ids):
+    """
+    Returns {doesthedog_id: record} for the ids found in the store.
+
+    """
+    ids = [int(doesthedog_id) for doesthedog_id in pd.unique(pd.Series(doesthedog_ids).dropna())]
+    found = {}
+    for start in range(0, len(ids), 900):
+        batch = ids[start:start + 900]
+        placeholders = ', '.join('?' * len(batch))
+        rows = conn.execute(
+            'SELECT title, doesthedog_id, topics, status, stats, fetched_at, release_year '
+            f'FROM responses WHERE doesthedog_id IN ({placeholders})', batch
+        )
+        for row in rows:
+            record = _row_to_record(row)
+            found[record['doesthedog_id']] = record
+    return found
+
+
+def rebuild_columns(df, conn, title_column='title', id_column='doesthedog_id'):
+    """
+    Fills 'topics' and 'doesthedog_id' from the store without any network access:
+    rows with a known doesthedog id are matched by id, the others by normalized title.
+
+    """
+    by_title = get_records(conn, df[title_column].tolist())
+    by_id = get_records_by_id(conn, df[id_column]) if id_column in df.columns else {}
+
+    def lookup(row_id, title):
+        if pd.notna(row_id) and int(row_id) in by_id:
+            return by_id[int(row_id)]
+        return by_title.get(title)
+
+    ids = df[id_column] if id_column in df.columns else pd.Series(pd.NA, index=df.index)
+    topics = df['topics'] if 'topics' in df.columns else pd.Series(None, index=df.index, dtype=object)
+    matches = [lookup(row_id, title) for row_id, title in zip(ids, df[title_column])]
+
+    df['topics'] = [record['topics'] if record else old for record, old in zip(matches, topics)]
+    df[id_column] = pd.array(
+        [record['doesthedog_id'] if record else old for record, old in zip(matches, ids)], dtype='Int64'
+    )
+    return df
+
+
+def records_frame(conn, ttl=None):
+    """
+    Returns every stored search hit (with a doesthedog id) as a DataFrame with 'title',
+    'doesthedog_id', 'topics' and 'release_year', e.g. as the right side of title_matching.resolve_ids
+    to link titles whose spelling differs from the stored one without new search requests.
+    With 'ttl' (seconds), entries fetched longer ago than that are left out.
+
+    """
+    oldest = time.time() - ttl if ttl is not None else float('-inf')
+    df = pd.read_sql_query(
+        'SELECT title, doesthedog_id, topics, release_year FROM responses '
+        'WHERE doesthedog_id IS NOT NULL AND status = 200 AND fetched_at >= ?', conn, params=(oldest,)
+    )
+    df['doesthedog_id'] = df['doesthedog_id'].astype('Int64')
+    df['release_year'] = df['release_year'].astype('Int64')
+    return df
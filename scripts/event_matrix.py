@@ -0,0 +1,90 @@
+# event_matrix.py
+# Sparse film x event and film x content-category matrices built from the 'events' column.
+
+import sys
+import json
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import content_tagging
+
+sys.path.append('./utils')
+import aggregation
+
+
+def build_membership_matrix(values, separator=',', vocabulary=None):
+    """
+    Builds a CSR 0/1 matrix (rows x labels) from a Series of separator-joined strings.
+    Labels are stripped and sorted unless a fixed 'vocabulary' is given (unknown labels are dropped).
+    Returns the matrix and the labels as a pandas Index (column id <-> label).
+
+    """
+    exploded = values.reset_index(drop=True).astype(object).str.split(separator).explode().dropna().str.strip()
+    exploded = exploded[exploded != '']
+
+    if vocabulary is None:
+        codes, labels = pd.factorize(exploded, sort=True)
+        labels = pd.Index(labels)
+    else:
+        labels = pd.Index(vocabulary)
+        codes = labels.get_indexer(exploded)
+
+    known = codes >= 0
+    rows = exploded.index.to_numpy(dtype='int64')[known]
+    cols = codes[known]
+
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype='uint8'), (rows, cols)), shape=(len(values), len(labels))
+    )
+    matrix.sum_duplicates()
+    matrix.data[:] = 1 # a label repeated within a row still counts once
+
+    return matrix, labels
+
+
+def event_matrix(df, column='events', separator=','):
+    """
+    Returns the CSR film x event matrix and its event labels.
+
+    """
+    return build_membership_matrix(df[column], separator=separator)
+
+
+def content_category_matrix(df, column='events', separator=','):
+    """
+    Returns the CSR film x content-category matrix (categories from content_tagging) and its labels.
+
+    """
+    dense = content_tagging.content_tag_matrix(df[column], separator=separator)
+    return sparse.csr_matrix(dense.to_numpy(dtype='uint8')), pd.Index(content_tagging.CATEGORY_NAMES)
+
+
+def weighted_mean_by_label(matrix, labels, values, weights=None):
+    """
+    Computes the (weighted) mean of 'values' per label (aggregation.membership_weighted_mean),
+    skipping rows where the value or weight is missing.
+
+    """
+    return pd.Series(aggregation.membership_weighted_mean(matrix, values, weights), index=labels)
+
+
+def save_membership(path_prefix, matrix, labels):
+    """
+    Saves a membership matrix as '<prefix>.npz' and its labels as '<prefix>_labels.json'.
+
+    """
+    sparse.save_npz(f'{path_prefix}.npz', matrix.tocsr())
+    with open(f'{path_prefix}_labels.json', 'w') as file:
+        json.dump(list(labels), file)
+
+
+def load_membership(path_prefix):
+    """
+    Loads a membership matrix and its labels saved with save_membership.
+
+    """
+    matrix = sparse.load_npz(f'{path_prefix}.npz').tocsr()
+    with open(f'{path_prefix}_labels.json', 'r') as file:
+        labels = pd.Index(json.load(file))
+    return matrix, labels
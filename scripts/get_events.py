@@ -2,11 +2,19 @@
 # Extract events from category codes.
 import pandas as pd
 import numpy as np
+import os
 import sys
+from itertools import chain
 
 sys.path.append('./utils')
-film_df = pd.read_csv('./data/clean/letterboxd_clean_films.csv') # update path to file to work with
-film_df
+sys.path.append('./scripts')
+import event_matrix
+import json_parser
+
+FILM_PATH = './data/clean/letterboxd_clean_films.csv' # update path to file to work with
+EVENTS_PATH = './data/local/clean/letterboxd_films_events.csv'
+EVENTS_MATRIX_PREFIX = './data/local/clean/film_events' # film x event matrix: <prefix>.npz + <prefix>_labels.json
+CATEGORIES_MATRIX_PREFIX = './data/local/clean/film_content_categories'
 
 # Dictionary for event description
 
@@ -211,7 +219,31 @@ event_dict = {
 }
 
 
-df = film_df.copy()
+
+def load_event_dict(path=json_parser.CATEGORIES_PATH):
+    """
+    Loads the topic code -> event table written by json_parser.build_categories.
+    Descriptions edited by hand in event_dict (e.g. to drop commas) take precedence.
+
+    """
+    categories = {str(code): event for code, event in json_parser.load_categories(path).items()}
+    return {**categories, **event_dict}
+
+
+def build_event_lookup(mapping=None):
+    """
+    Builds an array indexed by integer topic code holding the event description ('' for unknown codes).
+
+    """
+    mapping = event_dict if mapping is None else mapping
+    lookup = np.full(max(int(code) for code in mapping) + 1, '', dtype=object)
+    for code, event in mapping.items():
+        lookup[int(code)] = event
+    return lookup
+
+
+EVENT_LOOKUP = build_event_lookup()
+
 
 def topic_to_event(topics):
     if pd.isna(topics):
@@ -220,7 +252,6 @@ def topic_to_event(topics):
     events = [event_dict.get(topic.strip(), '') for topic in topic_list]
     return ', '.join(event for event in events if event) # join or skip empty string
 
-df['events'] = df['topics'].apply(topic_to_event)
 
 def check_warnings(events):
     if events is None:  # if 'events' is None, set to False
@@ -230,8 +261,98 @@ def check_warnings(events):
     else: 
         return True
 
-df['has_warnings'] = df['events'].apply(check_warnings)
 
-print(df[['events', 'has_warnings']].head())
+def decode_topics(topics, lookup=None):
+    """
+    Decodes a Series of comma-separated topic codes into a DataFrame with 'events' (joined
+    descriptions, None where topics is missing), 'has_warnings' and 'event_count'.
+    Same output as topic_to_event + check_warnings; each distinct topics string is split and
+    looked up once, with all codes mapped through the integer lookup array in one pass.
+
+    """
+    lookup = EVENT_LOOKUP if lookup is None else lookup
+    codes, uniques = pd.factorize(topics)
+    missing = codes < 0
+
+    if not len(uniques):
+        events = np.full(len(codes), None, dtype=object)
+        return pd.DataFrame({'events': events, 'has_warnings': ~missing, 'event_count': 0}, index=topics.index)
+
+    split = pd.Series(uniques, dtype=object).astype(str).str.split(',')
+    lengths = split.str.len().to_numpy(dtype='int64')
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+
+    # resolve each distinct code token once through the integer lookup array
+    token_codes, tokens = pd.factorize(pd.Series(list(chain.from_iterable(split)), dtype=object))
+    numbers = pd.to_numeric(pd.Series(tokens, dtype=object).str.strip(), errors='coerce').to_numpy(dtype='float64')
+    known = (numbers >= 0) & (numbers < len(lookup)) & (numbers == np.floor(numbers))
+    token_events = np.full(len(tokens), '', dtype=object)
+    token_events[known] = lookup[numbers[known].astype('int64')]
+
+    flat_events = token_events[token_codes]
+    unique_events = np.array(
+        [', '.join(filter(None, flat_events[start:end])) for start, end in zip(starts, ends)], dtype=object
+    )
+    unique_counts = np.add.reduceat((flat_events != '').astype('int64'), starts)
+
+    taken = np.where(missing, 0, codes)
+    events, counts = unique_events[taken], unique_counts[taken]
+    events[missing] = None
+    counts[missing] = 0
+
+    return pd.DataFrame({'events': events, 'has_warnings': ~missing, 'event_count': counts}, index=topics.index)
+
+
+def add_event_columns(df, column='topics', lookup=None):
+    """
+    Adds 'events', 'has_warnings' and 'event_count' decoded from the topics column.
+
+    """
+    decoded = decode_topics(df[column], lookup)
+    for name in decoded.columns:
+        df[name] = decoded[name]
+    return df
+
+
+def write_events(
+    film_path=FILM_PATH, output_path=EVENTS_PATH, categories_path=json_parser.CATEGORIES_PATH,
+    events_matrix_prefix=EVENTS_MATRIX_PREFIX, categories_matrix_prefix=CATEGORIES_MATRIX_PREFIX
+):
+    """
+    Reads a film table, decodes its topics with the event table from the categories CSV
+    and writes the table with the event columns added, plus the sparse film x event and
+    film x content-category matrices (row i = row i of the table) with their labels
+    (event_matrix.save_membership). A prefix of None skips that matrix.
+
+    """
+    lookup = build_event_lookup(load_event_dict(categories_path))
+    df = add_event_columns(pd.read_csv(film_path), lookup=lookup)
+
+    for path in [output_path, events_matrix_prefix, categories_matrix_prefix]:
+        directory = os.path.dirname(path) if path else ''
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    df.to_csv(output_path, index=False)
+
+    if events_matrix_prefix:
+        event_matrix.save_membership(events_matrix_prefix, *event_matrix.event_matrix(df))
+    if categories_matrix_prefix:
+        event_matrix.save_membership(categories_matrix_prefix, *event_matrix.content_category_matrix(df))
+    return output_path
+
+
+if __name__ == '__main__':
+    film_df = pd.read_csv(FILM_PATH)
+    df = add_event_columns(film_df.copy())
+
+    print(df[['events', 'has_warnings']].head())
 
+    # sparse film x event and film x content-category matrices (row i = row i of df)
+    events_matrix, event_labels = event_matrix.event_matrix(df)
+    categories_matrix, category_labels = event_matrix.content_category_matrix(df)
+    print(f'Event matrix: {events_matrix.shape}, {events_matrix.nnz} entries')
+    print(f'Content category matrix: {categories_matrix.shape}, {categories_matrix.nnz} entries')
 
+    # event_matrix.save_membership(EVENTS_MATRIX_PREFIX, events_matrix, event_labels)
+    # event_matrix.save_membership(CATEGORIES_MATRIX_PREFIX, categories_matrix, category_labels)
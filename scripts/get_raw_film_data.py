@@ -1,202 +1,273 @@
-# # TMDB + IMDB dataset 
+# # TMDB + IMDB dataset
 # https://www.kaggle.com/datasets/alanvourch/tmdb-movies-daily-updates
+# Streams the raw dump in chunks so peak memory is bounded by the chunk size, not the file size.
 
 
+import os
+from collections import Counter, defaultdict
+
+import numpy as np
 import pandas as pd
-import re
-import matplotlib.pyplot as plt
-import seaborn as sns
 
 
 import sys
 sys.path.append('./utils')
 import data_cleaning
-import data_inspection
+import filtering
 import helpers
 
 
-tmdb_df = pd.read_csv('./data/local/raw/TMDB_all_movies.csv')
-
-data_inspection.show_basic_info(tmdb_df)
-
-# drop columns
-tmdb_df.drop(columns=['cast', 'director_of_photography', 'music_composer', 'poster_path', 'writers', 'spoken_languages', 
-                      'tagline', 'overview', 'production_companies', 'production_countries', 'producers'], inplace=True)
-
-
-# check for duplicates
-data_inspection.check_for_duplicates(tmdb_df)
-
-
-# remove rows where 'status' is not 'Released'
-print(f'Unique values in status column:\n{tmdb_df['status'].unique()}\n')
-
-initial_rows = len(tmdb_df)
-tmdb_df = tmdb_df[tmdb_df['status'] == 'Released'] # keep rows where 'status' is 'Released'
-final_rows = len(tmdb_df)
-removed_rows = initial_rows - final_rows
-print(f'\nNumber of rows removed: {removed_rows}')
-
-
-# remove 'status' column after sorting
-tmdb_df.drop(['status'], axis=1, inplace=True)
-
-
-# create copy
-df = tmdb_df.copy()
-
-
-# convert 'release_date' to datetime, extract year and convert it to int
-df['release_date'] = pd.to_datetime(df['release_date'], errors='coerce')
-df['release_year'] = df['release_date'].dt.year.astype('Int64')
-print(df[['release_date', 'release_year']].head())
-
-
-# drop 'release_date' column
-df.drop(columns='release_date', inplace=True)
-
-
-release_year_counts = df['release_year'].value_counts().sort_index()
-print(f'Movie releases per year:\n{release_year_counts}')
-
-
-# filter out rows for a specific timeframe (eg between 1906 and 2018)
-initial_count = len(df)
-df = df[(df['release_year'] >= 1906) & (df['release_year'] <= 2018)]
-final_count = len(df)
-rows_dropped = initial_count - final_count
-print(f'Rows dropped after filtering year: {rows_dropped}')
-print(df)
-
-
-release_year_counts = df['release_year'].value_counts().sort_index()
-print(f'Movie releases per year:\n{release_year_counts}')
-
-
-data_inspection.show_missing_values(df)
-
-
-# drop missing titles
-df = data_cleaning.drop_empty_rows_from_column(df, 'title')
-
-
-# data conversion to int
-columns_to_convert = ['imdb_votes', 'revenue', 'budget', 'runtime', 'vote_count']
-data_cleaning.convert_columns_to_int(df, columns_to_convert)
-
+RAW_PATH = './data/local/raw/TMDB_all_movies.csv'
+CLEAN_PATH = './data/local/clean/films_before19_backup.csv'
+HASHES_PATH = './data/local/cache/tmdb_row_hashes.csv'
+CHUNK_SIZE = 100_000
 
-# get language names
-df['language'] = df['original_language'].apply(helpers.get_language_name)
-
-
-# handle unknown language(s)
-print(f'Unique values in language column:\n{df['language'].unique()}')
-print(f'Value counts in language column:\n{df['language'].value_counts()}')
-
-
-# replace [cn] with a proper label
-unknown_lang = df[df['original_language'] == 'cn']
-df['language'] = df['language'].replace('Unknown language [cn]', 'Cantonese')
-
-
-# replace [xx] with a proper label
-unknown_lang = df[df['original_language'] == 'xx']
-df['language'] = df['language'].replace('Unknown language [xx]', 'Unknown')
-
-
-print(f'Unique values in language column after re labeling: {df['language'].unique()}')
-
-
-# drop column after extracting languages
-df.drop(columns='original_language', inplace=True)
-
-
-# parse 'genres' column, make sure they're al lowcase, no extra empty spaces, separated by commas
-df['genres'] = helpers.clean_genres(df, 'genres')
-print('Unique genres:')
-print(df['genres'].unique())
-
-
-def drop_rows_with_specific_genres(df, column_name='genres', genres_to_exclude=None):
-    if genres_to_exclude is None:
-        genres_to_exclude = {'documentary', 'music'}
+DROP_COLUMNS = [
+    'cast', 'director_of_photography', 'music_composer', 'poster_path', 'writers', 'spoken_languages',
+    'tagline', 'overview', 'production_companies', 'production_countries', 'producers'
+]
+INT_COLUMNS = ['imdb_votes', 'revenue', 'budget', 'runtime', 'vote_count']
+GENRES_TO_EXCLUDE = {'documentary', 'music'}
+WORDS_TO_REMOVE = ['vixen', 'rape', 'slut', 'playboy', 'live at', 'baby einstein', 'championship', 'standup', 'wwe', 'wec', 'fia', 'playoff', 'ufc', 'mma', 'wcw', 'porn', 'snuff', 'nfl', 'nhl', 'raw sex', 'milf', 'molester', 'bondage', 'nba', 'tits', 'f1']
 
-    def contains_excluded_genre(genres):
-        if isinstance(genres, list):  # If genres is a list
-            return any(genre.strip().lower() in genres_to_exclude for genre in genres)
-        elif isinstance(genres, str):  # If genres is a comma-separated string
-            return any(genre.strip().lower() in genres_to_exclude for genre in genres.split(','))
-        return False  # For NaN or other invalid cases
+RENAME_COLUMNS = {
+    'id': 'tmdb_id',
+    'vote_average': 'tmdb_rating',
+    'vote_count': 'tmdb_votes'
+}
 
-    rows_before = len(df)  # Number of rows before filtering
-    filtered_df = df[~df[column_name].apply(contains_excluded_genre)]
-    rows_after = len(filtered_df)  # Number of rows after filtering
+CLEAN_INT_COLUMNS = [RENAME_COLUMNS.get(col, col) for col in INT_COLUMNS] + ['release_year']
 
-    rows_dropped = rows_before - rows_after
-    print(f'Number of rows dropped: {rows_dropped}')
+NEW_COLUMN_ORDER = [
+    'title', 'clean_title', 'original_title', 'genres', 'director', 'release_year',
+    'runtime', 'budget', 'revenue', 'popularity', 'tmdb_rating', 'tmdb_votes',
+    'imdb_rating', 'imdb_votes', 'language', 'tmdb_id', 'imdb_id'
+]
 
-    return filtered_df
 
-df = drop_rows_with_specific_genres(df, column_name='genres')
+def _drop_rows(df, keep, step, stats):
+    """
+    Keeps the rows where 'keep' is True and adds the number of dropped rows to stats[step].
 
+    """
+    stats[step] += int((~keep).sum())
+    return df[keep]
 
-df = helpers.drop_rows_by_runtime(df, column_name='runtime', min_runtime=40)
 
+def clean_chunk(chunk, stats, min_year=1906, max_year=2018, min_runtime=40, max_runtime=300):
+    """
+    Applies every cleaning step of the pipeline to one chunk of the raw dump.
+    Row counts dropped by each step and value counts for the log are accumulated in 'stats'.
 
-def remove_title_keywords(df, column_name, words_list):
-    if df is None:
-        raise ValueError("Input DataFrame is None")
-    
-    pattern = '|'.join([rf'\b{re.escape(word)}\b' for word in words_list])
-    
-    initial_count = len(df)  # This will fail if df is None
+    """
+    chunk = chunk.drop(columns=DROP_COLUMNS, errors='ignore')
 
-    df_filtered = df[~df[column_name].str.contains(pattern, case=False, na=False)]
+    # keep rows where 'status' is 'Released', then drop the column
+    stats['status_values'].update(chunk['status'].dropna().unique())
+    chunk = _drop_rows(chunk, chunk['status'] == 'Released', 'not released', stats)
+    chunk = chunk.drop(columns=['status'])
 
-    filtered_count = len(df_filtered)
-    print(f'Rows removed: {initial_count - filtered_count}')
-    
-    return df_filtered
+    # convert 'release_date' to datetime, extract year and convert it to int
+    release_date = pd.to_datetime(chunk['release_date'], errors='coerce')
+    chunk = chunk.drop(columns='release_date').assign(release_year=release_date.dt.year.astype('Int64'))
 
-words_to_remove = ['vixen', 'rape', 'slut', 'playboy', 'live at', 'baby einstein', 'championship', 'standup', 'wwe', 'wec', 'fia', 'playoff', 'ufc', 'mma', 'wcw', 'porn', 'snuff', 'nfl', 'nhl', 'raw sex', 'milf', 'molester', 'bondage', 'nba', 'tits', 'f1']
-df = remove_title_keywords(df, 'title', words_to_remove)
+    # filter out rows for a specific timeframe (eg between 1906 and 2018)
+    in_range = ((chunk['release_year'] >= min_year) & (chunk['release_year'] <= max_year)).fillna(False)
+    chunk = _drop_rows(chunk, in_range.astype(bool), 'release year', stats)
+    stats['release_years'].update(chunk['release_year'].value_counts().to_dict())
 
+    # drop missing titles
+    chunk = _drop_rows(chunk, chunk['title'].notna(), 'missing title', stats)
 
-data_inspection.show_missing_values(df)
+    # data conversion to int
+    chunk = data_cleaning.convert_columns_to_int(chunk.copy(), INT_COLUMNS)
 
+    # get language names (distinct codes resolved once, [cn] and [xx] relabeled)
+    chunk['language'] = helpers.resolve_language_names(chunk['original_language'])
+    chunk = chunk.drop(columns='original_language')
+    stats['languages'].update(chunk['language'].value_counts().loc[lambda counts: counts > 0].to_dict())
 
-rename_columns = {
-    'id': 'tmdb_id',
-    'vote_average': 'tmdb_rating',
-    'vote_count': 'tmdb_votes'
-}
+    # lowercase genres, consistent spacing after commas
+    chunk['genres'] = helpers.clean_genres(chunk, 'genres')
 
-df.rename(columns=rename_columns, inplace=True)
+    # runtime between min and max
+    chunk['runtime'] = pd.to_numeric(chunk['runtime'], errors='coerce')
+    chunk = _drop_rows(chunk, chunk['runtime'].notna(), 'runtime', stats)
+    chunk = _drop_rows(chunk, (chunk['runtime'] >= min_runtime) & (chunk['runtime'] <= max_runtime), 'runtime', stats)
 
+    # drop excluded genres and titles containing excluded keywords in one pass
+    chunk, report = filtering.apply_exclusion_filters(
+        chunk, title_column='title', keywords=WORDS_TO_REMOVE, genre_column='genres', excluded_genres=GENRES_TO_EXCLUDE
+    )
+    stats['exclusion filters'] += report.pop('rows removed')
+    stats['filter_hits'].update(report)
 
-# round decimals
-df['popularity'] = df['popularity'].round(1)
-df['tmdb_rating'] = df['tmdb_rating'].round(1)
+    chunk = chunk.rename(columns=RENAME_COLUMNS)
 
+    # round decimals
+    chunk['popularity'] = chunk['popularity'].round(1)
+    chunk['tmdb_rating'] = chunk['tmdb_rating'].round(1)
 
-# generate clean title column
-df['clean_title'] = helpers.prepare_clean_titles(df, 'title')
+    # generate clean title column
+    chunk['clean_title'] = helpers.prepare_clean_titles(chunk, 'title')
 
+    # restructure columns, keeping any extra ones at the end
+    final_column_order = [col for col in NEW_COLUMN_ORDER if col in chunk.columns]
+    final_column_order.extend(col for col in chunk.columns if col not in final_column_order)
 
-# restructure columns
-new_column_order = [
-    'title', 'clean_title', 'original_title', 'genres', 'director', 'release_year',
-    'runtime', 'budget', 'revenue', 'popularity', 'tmdb_rating', 'tmdb_votes', 
-    'imdb_rating', 'imdb_votes', 'language', 'tmdb_id', 'imdb_id'
-]
+    return chunk[final_column_order]
 
-# Ensure all columns are included, add any missing ones from the original DataFrame
-final_column_order = [col for col in new_column_order if col in df.columns]
-missing_columns = [col for col in df.columns if col not in final_column_order]
-final_column_order.extend(missing_columns)
 
-df = df[final_column_order]
+def print_summary(stats, rows_read, rows_written):
+    """
+    Prints the pipeline log accumulated over all chunks.
 
-## create .csv file
-df = df.sort_values(by='tmdb_id').reset_index(drop=True)
-# df.to_csv('../data/local/clean/films_before19_backup.csv', index=False)
\ No newline at end of file
+    """
+    print(f'Unique values in status column:\n{sorted(stats["status_values"])}\n')
+    print(f'Movie releases per year:\n{pd.Series(stats["release_years"]).sort_index()}')
+    print(f'Value counts in language column:\n{pd.Series(stats["languages"]).sort_values(ascending=False)}')
+    print(f'\nRows read: {rows_read}')
+    for step in ['not released', 'release year', 'missing title', 'runtime', 'exclusion filters']:
+        print(f'Rows removed ({step}): {stats[step]}')
+    print(f'Exclusion filter hits per rule:\n{pd.Series(stats["filter_hits"]).sort_values(ascending=False)}')
+    print(f'Rows written: {rows_written}')
+
+
+def run_pipeline(raw_path=RAW_PATH, output_path=CLEAN_PATH, chunk_size=CHUNK_SIZE, sort_output=True, **clean_kwargs):
+    """
+    Reads the raw dump in chunks, cleans each chunk and appends it to the clean CSV.
+    With sort_output=True the clean file is finally re-read (it holds only the kept rows and
+    columns) and sorted by 'tmdb_id', matching the output of the original full-frame script.
+
+    """
+    stats = defaultdict(int, status_values=set(), release_years=Counter(), languages=Counter(), filter_hits=Counter())
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    rows_read, rows_written, dtypes = 0, 0, None
+    for i, chunk in enumerate(pd.read_csv(raw_path, chunksize=chunk_size)):
+        rows_read += len(chunk)
+        cleaned = clean_chunk(chunk, stats, **clean_kwargs)
+        cleaned.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        rows_written += len(cleaned)
+        dtypes = dtypes or {col: str(dtype) for col, dtype in cleaned.dtypes.items() if str(dtype) == 'Int64'}
+
+    print_summary(stats, rows_read, rows_written)
+
+    if sort_output:
+        df = pd.read_csv(output_path, dtype=dtypes, float_precision='round_trip')
+        df = df.sort_values(by='tmdb_id').reset_index(drop=True)
+        df.to_csv(output_path, index=False)
+
+    return output_path
+
+
+# ------------------------------
+# Incremental Updates
+# ------------------------------
+
+def row_hashes(text_chunk, ids):
+    """
+    Returns a Series of uint64 hashes of the raw rows, indexed by 'ids'. The chunk must be read
+    as text (dtype=str, keep_default_na=False), so a row hashes the same whatever dtypes
+    pandas would infer for the chunk it lands in.
+
+    """
+    hashes = pd.util.hash_pandas_object(text_chunk, index=False)
+    return pd.Series(hashes.to_numpy(), index=np.asarray(ids))
+
+
+def load_row_hashes(path=HASHES_PATH):
+    """
+    Loads the raw row hashes stored by the last run as a Series indexed by id (empty if there is none).
+
+    """
+    if not os.path.exists(path):
+        return pd.Series(dtype='uint64')
+    stored = pd.read_csv(path, dtype={'id': 'int64', 'row_hash': 'uint64'})
+    stored = stored.drop_duplicates(subset='id', keep='last') # ids repeated in a dump keep their last row
+    return pd.Series(stored['row_hash'].to_numpy(), index=stored['id'].to_numpy())
+
+
+def save_row_hashes(hashes, path=HASHES_PATH):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    pd.DataFrame({'id': hashes.index, 'row_hash': hashes.to_numpy()}).to_csv(path, index=False)
+
+
+def run_incremental(
+    raw_path=RAW_PATH, output_path=CLEAN_PATH, hashes_path=HASHES_PATH, chunk_size=CHUNK_SIZE,
+    drop_missing=False, **clean_kwargs
+):
+    """
+    Updates the clean CSV from a new raw dump without rebuilding it: raw rows are hashed and
+    compared by id with the hashes stored by the last run, and only new or changed rows are cleaned
+    and upserted (changed rows that no longer pass the filters are removed). With drop_missing=True,
+    films that disappeared from the dump are removed too. Without stored hashes every row counts as new.
+    Returns the ids of the films that were added, updated or removed, so later stages
+    (events, tagging, sentiment) can be limited to them.
+
+    """
+    stats = defaultdict(int, status_values=set(), release_years=Counter(), languages=Counter(), filter_hits=Counter())
+    stored = load_row_hashes(hashes_path)
+
+    rows_read, changed_ids, cleaned_parts, new_hashes = 0, [], [], []
+    typed_chunks = pd.read_csv(raw_path, chunksize=chunk_size) # same chunks as run_pipeline, for cleaning
+    text_chunks = pd.read_csv(raw_path, chunksize=chunk_size, dtype=str, keep_default_na=False) # for hashing
+    for chunk, text_chunk in zip(typed_chunks, text_chunks):
+        rows_read += len(chunk)
+        hashes = row_hashes(text_chunk, chunk['id'])
+        new_hashes.append(hashes)
+
+        known = hashes.index.isin(stored.index)
+        changed = ~known
+        changed[known] = hashes.to_numpy()[known] != stored.reindex(hashes.index[known]).to_numpy()
+        if changed.any():
+            changed_ids.append(hashes.index[changed])
+            cleaned_parts.append(clean_chunk(chunk[changed], stats, **clean_kwargs))
+
+    new_hashes = pd.concat(new_hashes) if new_hashes else pd.Series(dtype='uint64')
+    changed_ids = pd.Index(np.concatenate(changed_ids)) if changed_ids else pd.Index([], dtype='int64')
+    if drop_missing:
+        changed_ids = changed_ids.append(stored.index.difference(new_hashes.index))
+
+    cleaned = pd.concat(cleaned_parts, ignore_index=True) if cleaned_parts else None
+    print_summary(stats, rows_read, 0 if cleaned is None else len(cleaned))
+    print(f'Rows new or changed: {len(changed_ids)}')
+    if len(changed_ids) == 0:
+        return changed_ids
+
+    if os.path.exists(output_path):
+        dtypes = {col: 'Int64' for col in CLEAN_INT_COLUMNS}
+        current = pd.read_csv(output_path, dtype=dtypes, float_precision='round_trip')
+        current = current[~current['tmdb_id'].isin(changed_ids)]
+        frames = [current] + ([cleaned] if cleaned is not None else [])
+        df = pd.concat(frames, ignore_index=True)
+    else:
+        df = cleaned
+
+    if df is None: # only removals and no clean table yet: nothing to write
+        print('Rows upserted: 0, no clean table to update')
+    else:
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        df = df.sort_values(by='tmdb_id').reset_index(drop=True)
+        df.to_csv(output_path, index=False)
+        print(f'Rows upserted: {0 if cleaned is None else len(cleaned)}, rows in clean table: {len(df)}')
+
+    if not drop_missing:
+        new_hashes = pd.concat([stored[~stored.index.isin(new_hashes.index)], new_hashes])
+    save_row_hashes(new_hashes, hashes_path)
+
+    return changed_ids
+
+
+if __name__ == '__main__':
+    if '--incremental' in sys.argv:
+        run_incremental()
+    else:
+        run_pipeline()
@@ -1,33 +1,183 @@
 # Extract category names out of category codes from the responses in doesthedogdie.com
+# Responses can be a single JSON file or a dump of many responses (NDJSON or documents written
+# back to back); dumps are decoded one document at a time from a rolling buffer.
 
 
+import csv
 import json
+import codecs
+import os
+import re
 
 
-with open('./data/doesthedog_response.json', 'r') as file:
-    data = json.load(file)
-
-categories_dict = {}
-
-if isinstance(data.get('topicItemStats'), list):
-    # Iterate over the list of topic items
-    for item in data['topicItemStats']:
-        # Check if 'topic' is present in the current item and is a dictionary
-        if isinstance(item.get('topic'), dict):
-            topic = item['topic']
-            # Extract 'id' and 'smmwDescription' (or other fields)
-            category = topic.get('id')
-            event = topic.get('smmwDescription')
-            
-            # Store the values in the dictionary
-            if category is not None and event is not None:
-                categories_dict[category] = event
-                print(f'Category: {category}, Event: {event}')
+RESPONSE_PATH = './data/doesthedog_response.json'
+CATEGORIES_PATH = './data/clean/doesthedog_categories.csv'
+CHUNK_SIZE = 1 << 20 # characters read per step
+WHITESPACE = re.compile(r'\s*')
+STRUCTURE = re.compile(r'[\\"{}\[\]]') # the characters that change string state or bracket depth
+
+
+def _stream_reader(stream):
+    """
+    Returns a read(size) function over a text or binary stream that returns as soon as a line
+    (or 'size' characters) has arrived, decoding bytes as UTF-8. An empty string means end of stream.
+
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+
+    def read(size):
+        while True:
+            data = stream.readline(size)
+            if not isinstance(data, bytes):
+                return data
+            text = decoder.decode(data, final=not data)
+            if text or not data: # a line cut inside a multi-byte character decodes to '' until completed
+                return text
+
+    return read
+
+
+def _scan_structure(text, state):
+    """
+    Follows the bracket depth of JSON text read in pieces, updating 'state'
+    ({'depth', 'in_string', 'skip'}) with this piece. Returns True if a top-level document
+    may end in it (depth back at 0), so decoding is only retried when it can succeed.
+
+    """
+    depth, in_string, position = state['depth'], state['in_string'], state['skip']
+    boundary = False
+    while True:
+        match = STRUCTURE.search(text, position)
+        if match is None:
+            break
+        char, position = match.group(), match.end()
+        if in_string:
+            if char == '\\':
+                position += 1 # skip the escaped character
+            elif char == '"':
+                in_string = False
+                boundary |= depth == 0
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            depth += 1
         else:
-            print(f'Topic is not a dictionary in item {item.get('topicItemId')}')
-else:
-    print('topicItemStats is not a list.')
+            depth -= 1
+            boundary |= depth <= 0
+
+    state.update(depth=depth, in_string=in_string, skip=max(0, position - len(text)))
+    return boundary or (depth <= 0 and not in_string and bool(text.strip())) # top-level scalars
+
+
+def _decode_documents(read, chunk_size):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    read_size = chunk_size
+    state = {'depth': 0, 'in_string': False, 'skip': 0}
+
+    while True:
+        chunk = read(read_size)
+        buffer += chunk
+        if chunk and not _scan_structure(chunk, state):
+            continue # no document can have ended in this chunk
+        position = 0
+        while True:
+            position = WHITESPACE.match(buffer, position).end()
+            if position == len(buffer):
+                break
+            try:
+                document, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk: # nothing left to read, the rest cannot be decoded
+                    raise
+                break # document continues in the next chunk
+            yield document
+        buffer = buffer[position:] # keep only the unread rest
+        read_size = max(chunk_size, len(buffer)) # grow the read for documents larger than a chunk
+        if not chunk:
+            return
+
+
+def iter_documents(source, chunk_size=CHUNK_SIZE):
+    """
+    Yields the JSON documents of a file one by one, whether it holds a single response,
+    one response per line (NDJSON) or responses concatenated back to back.
+    'source' is a path, or an open text or binary stream (a pipe, sys.stdin, a socket file):
+    streams are read line by line, so each NDJSON document is yielded as soon as its line arrives,
+    and are left open. Only the document being decoded and the unread rest of the current chunk
+    are held in memory.
+
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'r', encoding='utf-8') as file:
+            yield from _decode_documents(file.read, chunk_size)
+    else:
+        yield from _decode_documents(_stream_reader(source), chunk_size)
+
+
+def iter_topic_records(documents, verbose=False):
+    """
+    Yields one record per topic item of each response:
+    {'category': topic id, 'event': smmwDescription, 'yes_sum': yesSum, 'no_sum': noSum, 'item_id': ItemId}.
+    With verbose=True each topic is printed as it is read.
+
+    """
+    for data in documents:
+        if not isinstance(data.get('topicItemStats'), list):
+            if verbose:
+                print('topicItemStats is not a list.')
+            continue
+
+        for item in data['topicItemStats']:
+            if not isinstance(item.get('topic'), dict):
+                if verbose:
+                    print(f"Topic is not a dictionary in item {item.get('topicItemId')}")
+                continue
+
+            category = item['topic'].get('id')
+            event = item['topic'].get('smmwDescription')
+            if category is None or event is None:
+                continue
+
+            if verbose:
+                print(f'Category: {category}, Event: {event}')
+            yield {
+                'category': category, 'event': event,
+                'yes_sum': item.get('yesSum'), 'no_sum': item.get('noSum'), 'item_id': item.get('ItemId'),
+            }
+
+
+def build_categories(path=RESPONSE_PATH, output_path=None, verbose=False):
+    """
+    Builds the {category id: event description} dictionary from a response file, dump or stream.
+    With 'output_path' it is also written as a compact 'category,event' CSV table sorted by id.
+
+    """
+    categories_dict = {}
+    for record in iter_topic_records(iter_documents(path), verbose=verbose):
+        categories_dict[record['category']] = record['event']
+
+    if output_path:
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(output_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(['category', 'event'])
+            writer.writerows(sorted(categories_dict.items()))
+
+    return categories_dict
+
+
+def load_categories(path=CATEGORIES_PATH):
+    """
+    Reads a table written by build_categories back into a {category id: event} dictionary.
 
-print(categories_dict)
+    """
+    with open(path, 'r', newline='', encoding='utf-8') as file:
+        return {int(row['category']): row['event'] for row in csv.DictReader(file)}
 
 
+if __name__ == '__main__':
+    categories_dict = build_categories(RESPONSE_PATH, output_path=CATEGORIES_PATH, verbose=True)
+    print(categories_dict)
@@ -0,0 +1,364 @@
+# pipeline.py
+# Runs the data pipeline as a graph of stages that declare their input and output files.
+# A stage is skipped when the content of its inputs, its code (and its parameters) has not changed
+# since its last successful run and its outputs still exist; stages that do not depend on each other
+# run in parallel processes.
+
+import os
+import ast
+import sys
+import json
+import hashlib
+import importlib
+import importlib.util
+import subprocess
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+sys.path.append('./utils')
+sys.path.append('./scripts')
+
+
+STATE_PATH = './data/local/cache/pipeline_state.json'
+
+
+@dataclass
+class Stage:
+    """
+    One pipeline step. 'target' is a 'module.function' name called with 'kwargs', or a
+    command list (e.g. ['jupyter', 'nbconvert', '--execute', ...]) run as a subprocess.
+
+    """
+    name: str
+    target: object
+    inputs: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+    kwargs: dict = field(default_factory=dict)
+
+
+# ------------------------------
+# Hashing and State Functions
+# ------------------------------
+
+def file_hash(path, block_size=1 << 20):
+    """
+    Returns the blake2b digest of a file's content, or of every file under a directory.
+    Missing paths hash to None.
+
+    """
+    if not os.path.exists(path):
+        return None
+
+    digest = hashlib.blake2b(digest_size=16)
+    paths = [path]
+    if os.path.isdir(path):
+        paths = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+
+    for file_path in paths:
+        digest.update(os.path.relpath(file_path, path).encode('utf-8'))
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(block_size), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _module_path(name):
+    """
+    Returns the repository-relative source file of a module found on sys.path, or None for
+    modules outside the repository (standard library, installed packages) or not found.
+
+    """
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+    if spec is None or not spec.origin or not spec.origin.endswith('.py'):
+        return None
+    path = os.path.relpath(spec.origin)
+    if path.startswith('..') or 'site-packages' in path:
+        return None
+    return path
+
+
+def _imported_names(source):
+    """
+    Returns the top-level module names imported by Python source (unparsable parts are skipped).
+
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return set()
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module.split('.')[0])
+    return names
+
+
+def _source_text(path):
+    if path.endswith('.ipynb'): # code cells only; one cell with a magic does not hide the others
+        with open(path, 'r', encoding='utf-8') as file:
+            cells = json.load(file)['cells']
+        return [''.join(cell['source']) for cell in cells if cell['cell_type'] == 'code']
+    with open(path, 'r', encoding='utf-8') as file:
+        return [file.read()]
+
+
+def code_paths(stage):
+    """
+    Returns the source files of a stage's code: the module of a 'module.function' target, or the
+    existing files (e.g. the notebook) among the arguments of a command, plus every repository
+    module they import, directly or through other repository modules.
+
+    """
+    if isinstance(stage.target, (list, tuple)):
+        roots = [arg for arg in stage.target if os.path.isfile(arg)]
+    else:
+        roots = [path for path in [_module_path(stage.target.rsplit('.', 1)[0])] if path]
+
+    paths, queue = [], list(roots)
+    while queue:
+        path = queue.pop()
+        if path in paths:
+            continue
+        paths.append(path)
+        for text in _source_text(path):
+            queue.extend(filter(None, map(_module_path, _imported_names(text))))
+    return sorted(paths)
+
+
+def stage_fingerprint(stage):
+    """
+    Hashes everything that decides a stage's result: its target, code, parameters and input contents.
+
+    """
+    return {
+        'target': json.dumps(stage.target, default=str),
+        'code': {path: file_hash(path) for path in code_paths(stage)},
+        'kwargs': json.dumps(stage.kwargs, sort_keys=True, default=str),
+        'inputs': {path: file_hash(path) for path in stage.inputs},
+    }
+
+
+def load_state(path=STATE_PATH):
+    if os.path.exists(path):
+        with open(path, 'r') as file:
+            return json.load(file)
+    return {}
+
+
+def save_state(state, path=STATE_PATH):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump(state, file, indent=1, sort_keys=True)
+
+
+def is_up_to_date(stage, state, fingerprint):
+    return state.get(stage.name) == fingerprint and all(os.path.exists(path) for path in stage.outputs)
+
+
+# ------------------------------
+# Graph Functions
+# ------------------------------
+
+def stage_dependencies(stages):
+    """
+    Returns {stage name: set of stage names producing its inputs}.
+    Raises ValueError for duplicate names, outputs produced twice or dependency cycles.
+
+    """
+    names = [stage.name for stage in stages]
+    if len(set(names)) != len(names):
+        raise ValueError('Stage names must be unique.')
+
+    producers = {}
+    for stage in stages:
+        for path in stage.outputs:
+            if path in producers:
+                raise ValueError(f"'{path}' is produced by both '{producers[path]}' and '{stage.name}'.")
+            producers[path] = stage.name
+
+    dependencies = {
+        stage.name: {producers[path] for path in stage.inputs if path in producers} - {stage.name}
+        for stage in stages
+    }
+
+    visited, active = set(), set()
+
+    def visit(name):
+        if name in active:
+            raise ValueError(f"Dependency cycle through stage '{name}'.")
+        if name not in visited:
+            active.add(name)
+            for dependency in dependencies[name]:
+                visit(dependency)
+            active.remove(name)
+            visited.add(name)
+
+    for name in names:
+        visit(name)
+    return dependencies
+
+
+def run_stage(target, kwargs):
+    """
+    Runs one stage target in the current process (called inside the worker processes).
+
+    """
+    if isinstance(target, (list, tuple)):
+        subprocess.run(list(target), check=True)
+        return
+    module_name, function_name = target.rsplit('.', 1)
+    getattr(importlib.import_module(module_name), function_name)(**kwargs)
+
+
+# ------------------------------
+# Runner
+# ------------------------------
+
+def run_stages(stages, state_path=STATE_PATH, max_workers=None, force=()):
+    """
+    Runs the stages in dependency order, skipping those that are up to date and running ready
+    stages side by side in up to 'max_workers' processes. Stages named in 'force' always run.
+    The state is saved after every finished stage, so an interrupted run keeps its progress.
+    A stage that raises, or finishes without writing all of its declared outputs, has failed.
+    Returns {stage name: 'ran' | 'skipped' | 'failed' | 'blocked'}.
+
+    """
+    by_name = {stage.name: stage for stage in stages}
+    dependencies = stage_dependencies(stages)
+    state = load_state(state_path)
+    status = {}
+    running = {}
+
+    def ready():
+        return [
+            name for name in by_name
+            if name not in status and name not in running.values()
+            and all(status.get(dependency) in ('ran', 'skipped') for dependency in dependencies[name])
+        ]
+
+    def blocked():
+        return [
+            name for name in by_name
+            if name not in status and any(status.get(dependency) in ('failed', 'blocked') for dependency in dependencies[name])
+        ]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        while len(status) < len(by_name):
+            for name in blocked():
+                status[name] = 'blocked'
+                print(f'[{name}] blocked by a failed dependency')
+
+            for name in ready():
+                stage = by_name[name]
+                fingerprint = stage_fingerprint(stage) # inputs are final once all dependencies are done
+                if name not in force and is_up_to_date(stage, state, fingerprint):
+                    status[name] = 'skipped'
+                    print(f'[{name}] up to date, skipped')
+                    continue
+                print(f'[{name}] running')
+                running[executor.submit(run_stage, stage.target, stage.kwargs)] = name
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    future.result()
+                    missing = [path for path in by_name[name].outputs if not os.path.exists(path)]
+                    if missing:
+                        raise FileNotFoundError(f'declared outputs not written: {missing}')
+                except Exception as error:
+                    status[name] = 'failed'
+                    state.pop(name, None)
+                    print(f'[{name}] failed: {error}')
+                else:
+                    status[name] = 'ran'
+                    state[name] = stage_fingerprint(by_name[name])
+                    print(f'[{name}] done')
+                save_state(state, state_path)
+
+    return status
+
+
+# ------------------------------
+# Stages
+# ------------------------------
+# The notebooks (combine_dfs, letterboxd_data, the sentiment notebooks, ...) are not stages:
+# their save cells are commented out, so they write none of the tables they are run for.
+# A notebook that does write its outputs can be added with notebook_stage, with paths from
+# the repository root (the notebook itself runs from its own directory and uses '../data/...').
+
+NOTEBOOK_RUN_DIR = './data/local/cache/notebooks'
+
+
+def notebook_stage(name, notebook, inputs=(), outputs=()):
+    """
+    Returns a stage that executes a notebook with nbconvert. The executed copy is written to
+    NOTEBOOK_RUN_DIR, so the tracked notebook is left unchanged.
+
+    """
+    command = [
+        'jupyter', 'nbconvert', '--to', 'notebook', '--execute', notebook, '--output-dir', NOTEBOOK_RUN_DIR
+    ]
+    return Stage(name, command, inputs=list(inputs), outputs=list(outputs))
+
+
+TMDB_RAW_PATH = './data/local/raw/TMDB_all_movies.csv'
+TMDB_CLEAN_PATH = './data/local/clean/films_before19_backup.csv'
+TOPICS_PATH = './data/local/clean/films_topics.csv'
+RESPONSE_PATH = './data/doesthedog_response.json'
+CATEGORIES_PATH = './data/clean/doesthedog_categories.csv'
+EVENTS_PATH = './data/local/clean/films_events.csv'
+EVENTS_MATRIX_PREFIX = './data/local/clean/films_event_matrix'
+CATEGORIES_MATRIX_PREFIX = './data/local/clean/films_category_matrix'
+TAGGED_PATH = './data/local/clean/films_tagged.csv'
+
+PIPELINE = [
+    # get_raw_film_data -> doesthedogdie topics -> get_events -> content_tagging
+    Stage(
+        'tmdb_clean', 'get_raw_film_data.run_pipeline',
+        inputs=[TMDB_RAW_PATH], outputs=[TMDB_CLEAN_PATH],
+        kwargs={'raw_path': TMDB_RAW_PATH, 'output_path': TMDB_CLEAN_PATH},
+    ),
+    Stage(
+        'doesthedog_topics', 'doesthedog_client.fetch_file',
+        inputs=[TMDB_CLEAN_PATH], outputs=[TOPICS_PATH],
+        kwargs={'film_path': TMDB_CLEAN_PATH, 'output_path': TOPICS_PATH},
+    ),
+    Stage(
+        'get_events', 'get_events.write_events',
+        inputs=[TOPICS_PATH, CATEGORIES_PATH],
+        outputs=[
+            EVENTS_PATH,
+            *(f'{prefix}{suffix}' for prefix in [EVENTS_MATRIX_PREFIX, CATEGORIES_MATRIX_PREFIX] for suffix in ['.npz', '_labels.json']),
+        ],
+        kwargs={
+            'film_path': TOPICS_PATH, 'output_path': EVENTS_PATH, 'categories_path': CATEGORIES_PATH,
+            'events_matrix_prefix': EVENTS_MATRIX_PREFIX, 'categories_matrix_prefix': CATEGORIES_MATRIX_PREFIX,
+        },
+    ),
+    Stage(
+        'content_tagging', 'content_tagging.tag_file',
+        inputs=[EVENTS_PATH], outputs=[TAGGED_PATH],
+        kwargs={'input_path': EVENTS_PATH, 'output_path': TAGGED_PATH},
+    ),
+    # runs alongside the TMDB branch
+    Stage(
+        'doesthedog_categories', 'json_parser.build_categories',
+        inputs=[RESPONSE_PATH], outputs=[CATEGORIES_PATH],
+        kwargs={'path': RESPONSE_PATH, 'output_path': CATEGORIES_PATH},
+    ),
+]
+
+if __name__ == '__main__':
+    force = sys.argv[1:] # stage names to rerun regardless of their state
+    run_stages(PIPELINE, force=force)
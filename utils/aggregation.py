@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+
+# ------------------------------
+# Weighted Rating Aggregation Functions
+# ------------------------------
+
+def _as_float(series):
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _group_weighted_mean(sum_by_group, values, weights):
+    """
+    Returns the weighted mean of 'values' per group, skipping rows where the value or weight
+    is missing; groups without any weight are NaN.
+
+    """
+    valid = ~(np.isnan(values) | np.isnan(weights))
+    weighted_sum = sum_by_group(np.where(valid, values * weights, 0.0))
+    total_weight = sum_by_group(np.where(valid, weights, 0.0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(total_weight > 0, weighted_sum / total_weight, np.nan)
+
+
+def _membership_sums(matrix):
+    transposed = matrix.T.tocsr().astype('float64')
+
+    def sum_by_group(values):
+        return transposed @ values
+
+    return sum_by_group
+
+
+def membership_weighted_mean(matrix, values, weights=None):
+    """
+    Returns the (weighted) mean of 'values' per column of a sparse rows x labels membership
+    matrix as sparse matrix products, skipping rows where the value or weight is missing.
+
+    """
+    values = np.asarray(values, dtype='float64')
+    weights = np.ones_like(values) if weights is None else np.asarray(weights, dtype='float64')
+    return _group_weighted_mean(_membership_sums(matrix), values, weights)
+
+
+def _weighted_table(df, sum_by_group, groups, group_col, rating_cols, votes_cols, popularity_col):
+    """
+    Builds the weighted ratings table given a function that sums a per-row vector by group.
+    Weights are votes x popularity over the rows where both the rating and its votes are present.
+
+    """
+    popularity = _as_float(df[popularity_col])
+    table = {group_col: groups}
+
+    for rating_col, votes_col in zip(rating_cols, votes_cols):
+        ratings, votes = _as_float(df[rating_col]), _as_float(df[votes_col])
+        weights = votes * popularity # rows with missing popularity add nothing, as in Series.sum
+        table[rating_col] = np.round(_group_weighted_mean(sum_by_group, ratings, weights), 1)
+
+    has_popularity = ~np.isnan(popularity)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        average_popularity = sum_by_group(np.where(has_popularity, popularity, 0.0)) / sum_by_group(has_popularity.astype('float64'))
+    table['average_popularity'] = np.round(average_popularity, 1)
+
+    return pd.DataFrame(table)
+
+
+def weighted_mean_with_votes_and_popularity(df, group_col, rating_cols, votes_cols, popularity_col):
+    """
+    Calculate weighted averages for multiple ratings using corresponding votes and popularity,
+    on a frame exploded to one row per group value (e.g. genre, event or content tag).
+    All rating/vote pairs are summed per group in one vectorized pass; groups are sorted and
+    ratings without any weight are NaN.
+
+    """
+    codes, groups = pd.factorize(df[group_col], sort=True)
+    known = codes >= 0 # missing groups are left out, as in groupby
+
+    def sum_by_group(values):
+        return np.bincount(codes[known], weights=values[known], minlength=len(groups))
+
+    return _weighted_table(df, sum_by_group, groups, group_col, rating_cols, votes_cols, popularity_col)
+
+
+def weighted_mean_by_membership(
+    matrix, labels, df, rating_cols, votes_cols, popularity_col, group_col='label', drop_empty=True
+):
+    """
+    Same table as weighted_mean_with_votes_and_popularity, computed from a sparse film x label
+    membership matrix (see scripts/event_matrix.py) whose rows line up with the film frame 'df',
+    so the frame never has to be exploded. Labels no film carries are dropped unless drop_empty=False.
+
+    """
+    table = _weighted_table(df, _membership_sums(matrix), pd.Index(labels), group_col, rating_cols, votes_cols, popularity_col)
+    if drop_empty:
+        table = table[np.asarray(matrix.sum(axis=0)).ravel() > 0].reset_index(drop=True)
+    return table
@@ -1,7 +1,10 @@
+import numpy as np
 import pandas as pd
 import re
 from datetime import datetime
 
+import dataset_io
+
 # ------------------------------
 # Data Cleaning Functions
 # ------------------------------
@@ -102,22 +105,148 @@ def convert_strings_to_lowercase(df, column_name):
     return df
 
 
-def convert_columns_to_int(df, columns):
+def convert_columns_to_int(df, columns, downcast=False):
     """ 
     Converts specified columns in the DataFrame to Int64 type, handling errors gracefully. 
+    With downcast=True each column gets the smallest nullable int type its values fit in.
     
     """
     columns_to_convert = [col for col in columns if col in df.columns]
 
     df[columns_to_convert] = df[columns_to_convert].apply(pd.to_numeric, errors='coerce').astype('Int64') # convert to int, handle errors
 
+    if downcast:
+        for col in columns_to_convert:
+            df[col] = df[col].astype(smallest_int_dtype(df[col]))
+
     return df
 
 
+# ------------------------------
+# Memory Compaction Functions
+# ------------------------------
+
+INT_DTYPES = ['Int8', 'Int16', 'Int32', 'Int64']
+
+
+def smallest_int_dtype(values):
+    """
+    Returns the smallest nullable int dtype ('Int8' to 'Int64') that holds all values of an integer Series.
+
+    """
+    if values.notna().sum() == 0:
+        return 'Int8'
+    low, high = values.min(), values.max()
+    for dtype in INT_DTYPES:
+        info = np.iinfo(dtype.lower())
+        if info.min <= low and high <= info.max:
+            return dtype
+    return 'Int64'
+
+
+def compact_dtypes(df, schema=None, category_ratio=0.5, multi_value_columns=('genres',), downcast_ints=True, verbose=True):
+    """
+    Shrinks a film DataFrame to compact dtypes. Columns declared in 'schema'
+    (dataset_io.FILM_SCHEMA by default) first get their declared dtype via dataset_io.apply_schema, then:
+    - integer columns (int or Int64) get the smallest nullable int type unless downcast_ints=False;
+      write_dataset casts them back to the schema's Int64 on disk. Float columns are kept
+      (read integer columns with NaN via convert_columns_to_int first),
+    - undeclared string columns with few distinct values (distinct/rows <= 'category_ratio') become 'category',
+    - undeclared multi-valued columns such as 'genres' always become 'category', so every distinct
+      combination is stored once and rows only hold its code,
+    - undeclared object columns holding only booleans become the nullable 'boolean' type.
+    The input frame is left unchanged.
+    Returns the compacted DataFrame and a report with the memory (MB) before and after.
+
+    """
+    schema = dataset_io.FILM_SCHEMA if schema is None else schema
+    memory_before = df.memory_usage(deep=True).sum()
+
+    df = dataset_io.apply_schema(df.copy(), schema)
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_bool_dtype(values):
+            continue
+        elif pd.api.types.is_integer_dtype(values):
+            if downcast_ints:
+                df[column] = values.astype(smallest_int_dtype(values))
+        elif column in schema:
+            continue
+        elif values.dtype == object:
+            non_null = values.dropna()
+            if len(non_null) and non_null.map(lambda value: isinstance(value, (bool, np.bool_))).all():
+                df[column] = values.map(dataset_io.BOOLEAN_VALUES).astype('boolean')
+            elif column in multi_value_columns or (len(non_null) and non_null.nunique() <= category_ratio * len(non_null)):
+                df[column] = values.astype('category')
+
+    memory_after = df.memory_usage(deep=True).sum()
+    report = {
+        'memory_before_mb': round(float(memory_before) / 1024**2, 2),
+        'memory_after_mb': round(float(memory_after) / 1024**2, 2),
+        'ratio': round(float(memory_before / memory_after), 2) if memory_after else None,
+    }
+    if verbose:
+        print(f"Memory usage: {report['memory_before_mb']} MB -> {report['memory_after_mb']} MB ({report['ratio']}x smaller)")
+
+    return df, report
+
+
 # ------------------------------
 # Grouping and Merging Functions
 # ------------------------------
 
+def _group_slices(df_to_group, group_by_col, join_col):
+    """
+    Stable-sorts a child table by its (non-null) group keys and returns the sorted keys of each group,
+    the values in group order and the start/end offsets of every group in that array.
+
+    """
+    child = df_to_group[[group_by_col, join_col]].dropna()
+    codes, uniques = pd.factorize(child[group_by_col], sort=True)
+    order = np.argsort(codes, kind='stable') # keeps the original order of values inside each group
+    values = child[join_col].to_numpy(dtype=object)[order]
+
+    bounds = np.flatnonzero(np.diff(codes[order])) + 1
+    starts = np.r_[0, bounds] if len(values) else np.array([], dtype='int64')
+    ends = np.r_[bounds, len(values)] if len(values) else np.array([], dtype='int64')
+    return uniques, values, starts, ends
+
+
+def group_and_join_many(df_main, children, group_by_col, separator=', ', fillna_value='', as_codes=False):
+    """
+    Groups and joins values from several child tables at once, then merges all the new columns
+    back to the main dataframe in a single merge.
+    'children' maps each new column name to a (df_to_group, join_col) pair, e.g.
+    {'genres': (df_genres, 'genre'), 'countries': (df_countries, 'country')}.
+    With as_codes=True the new columns hold lists of integer codes instead of joined strings
+    (films without values get an empty list) and a {new_col_name: vocabulary} dict is returned too.
+
+    """
+    grouped, vocabularies = {}, {}
+
+    for new_col_name, (df_to_group, join_col) in children.items():
+        keys, values, starts, ends = _group_slices(df_to_group, group_by_col, join_col)
+        if as_codes:
+            codes, vocabulary = pd.factorize(values)
+            vocabularies[new_col_name] = pd.Index(vocabulary)
+            joined = [codes[start:end].tolist() for start, end in zip(starts, ends)]
+        else:
+            joined = [separator.join(values[start:end]) for start, end in zip(starts, ends)]
+        grouped[new_col_name] = pd.Series(joined, index=keys, dtype=object)
+
+    grouped = pd.DataFrame(grouped)
+    grouped.index.name = group_by_col
+    df_main = df_main.merge(grouped.reset_index(), on=group_by_col, how='left') # one merge for all columns
+
+    for new_col_name in children:
+        if as_codes:
+            df_main[new_col_name] = [codes if isinstance(codes, list) else [] for codes in df_main[new_col_name]]
+        else:
+            df_main[new_col_name] = df_main[new_col_name].fillna(fillna_value) # fill nan w specified value
+
+    return (df_main, vocabularies) if as_codes else df_main
+
+
 def group_and_join_columns(
     df_main, df_to_group, group_by_col, join_col, new_col_name=None, separator=', ', fillna_value=''
 ):
@@ -127,18 +256,63 @@ def group_and_join_columns(
     """
     if new_col_name is None:
         new_col_name = join_col + 's'
-    
-    grouped = ( # group and join values
-        df_to_group.groupby(group_by_col)[join_col] 
-        .apply(lambda x: separator.join(x))
-        .reset_index()
+
+    return group_and_join_many(
+        df_main, {new_col_name: (df_to_group, join_col)}, group_by_col, separator=separator, fillna_value=fillna_value
     )
 
-    grouped.rename(columns={join_col: new_col_name}, inplace=True) # rename join_col to avoid conflicts
-    df_main = df_main.merge(grouped, on=group_by_col, how='left') # merge with main df
-    df_main[new_col_name] = df_main[new_col_name].fillna(fillna_value) # fill nan w specified value
 
-    return df_main
+def backfill_columns(df_main, df_mapping, main_column, columns, defaults=None, duplicates='first', verbose=True):
+    """
+    Fills the empty values of several columns in the main dataframe ('df_main') from a mapping
+    dataframe ('df_mapping') joined on 'main_column'. The key index is built once for all columns.
+    'columns' maps each column to fill to its source column in 'df_mapping' (a list means same names);
+    'defaults' optionally maps a column to a second source used for values still empty afterwards.
+    'duplicates' decides which row wins for repeated keys in the mapping: 'first', 'last' or 'error'.
+    Returns the updated dataframe and a {column: values filled} dict (printed when verbose).
+
+    """
+    if not isinstance(columns, dict):
+        columns = {column: column for column in columns}
+    defaults = defaults or {}
+
+    if duplicates == 'error':
+        if df_mapping[main_column].duplicated().any():
+            raise ValueError(f"Duplicate keys in '{main_column}' of the mapping dataframe.")
+        mapping = df_mapping
+    elif duplicates in ('first', 'last'):
+        mapping = df_mapping.drop_duplicates(subset=main_column, keep=duplicates)
+    else:
+        raise ValueError("duplicates must be 'first', 'last' or 'error'.")
+
+    positions = pd.Index(mapping[main_column]).get_indexer(df_main[main_column]) # -1 where the key is unknown
+
+    def mapped(source_column):
+        values = mapping[source_column].reset_index(drop=True).reindex(positions) # position -1 gives NaN
+        return values.set_axis(df_main.index)
+
+    filled = {}
+    for new_column, mapping_column in columns.items():
+        if mapping_column not in mapping.columns:
+            print(f"Warning: '{mapping_column}' is missing in the mapping dataframe. Skipping update.")
+            continue
+        sources = [source for source in (mapping_column, defaults.get(new_column)) if source in mapping.columns]
+
+        if new_column not in df_main.columns: # make sure new col exists
+            df_main[new_column] = pd.NA
+        empty_before = int(df_main[new_column].isna().sum())
+
+        for source in sources:
+            current = df_main[new_column]
+            df_main[new_column] = current.where(current.notna(), mapped(source))
+
+        filled[new_column] = empty_before - int(df_main[new_column].isna().sum())
+
+    if verbose:
+        for new_column, count in filled.items():
+            print(f"Filled {count} empty values in '{new_column}'.")
+
+    return df_main, filled
 
 
 def update_empty_column(
@@ -148,23 +322,10 @@ def update_empty_column(
     Updates a column in the main dataframe ('df_main') by mapping values from a secondary dataframe ('df_mapping').
 
     """
-    if mapping_column in df_mapping.columns:
-        mapping_dict = df_mapping.set_index(main_column)[mapping_column]
-
-        if new_column not in df_main.columns: # make sure new col exists
-            df_main[new_column] = pd.NA 
-
-        df_main[new_column] = df_main[new_column].combine_first(
-            df_main[main_column].map(mapping_dict)
-        )
-
-        if default_column and default_column in df_mapping.columns:
-            df_main[new_column] = df_main[new_column].fillna(
-                df_main[main_column].map(df_mapping.set_index(main_column)[default_column])
-            )
-    else:
-        print(f"Warning: '{mapping_column}' is missing in the mapping dataframe. Skipping update.")
-    
+    df_main, _ = backfill_columns(
+        df_main, df_mapping, main_column, {new_column: mapping_column},
+        defaults={new_column: default_column} if default_column else None, verbose=False
+    )
     return df_main
 
 
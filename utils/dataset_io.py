@@ -0,0 +1,134 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# ------------------------------
+# Film Table Schema
+# ------------------------------
+
+FILM_SCHEMA = {
+    'tmdb_id': 'Int64',
+    'imdb_id': 'string',
+    'letterboxd_id': 'Int64',
+    'doesthedog_id': 'Int64',
+    'title': 'string',
+    'clean_title': 'string',
+    'original_title': 'string',
+    'release_year': 'Int64',
+    'runtime': 'Int64',
+    'budget': 'Int64',
+    'revenue': 'Int64',
+    'profit': 'Int64',
+    'tmdb_votes': 'Int64',
+    'imdb_votes': 'Int64',
+    'popularity': 'float64',
+    'tmdb_rating': 'float64',
+    'imdb_rating': 'float64',
+    'letterboxd_rating': 'float64',
+    'has_warnings': 'boolean',
+    'language': 'category',
+    'genres': 'category',
+    'countries': 'category',
+    'country': 'category',
+}
+
+BOOLEAN_VALUES = {True: True, False: False, 'True': True, 'False': False, 'true': True, 'false': False}
+
+
+def apply_schema(df, schema=None):
+    """
+    Casts the columns present in the DataFrame to the dtypes declared in the schema (FILM_SCHEMA by default).
+    Columns not in the schema are left as they are.
+
+    """
+    schema = FILM_SCHEMA if schema is None else schema
+
+    for column, dtype in schema.items():
+        if column not in df.columns or str(df[column].dtype) == dtype:
+            continue
+        if dtype == 'boolean':
+            df[column] = df[column].map(BOOLEAN_VALUES).astype('boolean')
+        elif dtype.startswith(('Int', 'float')):
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+        else:
+            df[column] = df[column].astype(dtype)
+
+    return df
+
+
+# ------------------------------
+# Parquet Read / Write Functions
+# ------------------------------
+
+def write_dataset(df, path, schema=None, sort_by=None, row_group_size=100_000, compression='zstd'):
+    """
+    Writes a film table to Parquet with the schema applied; categorical columns are stored
+    dictionary-encoded. Sorting by a column that is often filtered on (e.g. 'release_year')
+    keeps row groups narrow so read_dataset can skip them.
+
+    """
+    df = apply_schema(df.copy(), schema)
+    if sort_by is not None:
+        df = df.sort_values(by=sort_by, kind='stable').reset_index(drop=True)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(table, path, row_group_size=row_group_size, compression=compression, use_dictionary=True)
+
+
+def read_dataset(path, columns=None, filters=None, schema=None):
+    """
+    Reads a film table, loading only the requested columns and the row groups that can match
+    the filters (pyarrow format, e.g. [('release_year', '==', 2018)]).
+    CSV paths are also accepted: they are parsed with the schema applied and filtered in pandas.
+
+    """
+    if path.endswith('.csv'):
+        df = pd.read_csv(path, usecols=_csv_columns(path, columns, filters))
+        df = _filter_frame(apply_schema(df, schema), filters)
+        return df[columns] if columns is not None else df
+
+    table = pq.read_table(path, columns=columns, filters=filters)
+    return table.to_pandas()
+
+
+def convert_csv_to_parquet(csv_path, parquet_path=None, schema=None, sort_by=None):
+    """
+    Converts a clean CSV table to Parquet next to it (or to 'parquet_path') and returns the Parquet path.
+
+    """
+    parquet_path = parquet_path or os.path.splitext(csv_path)[0] + '.parquet'
+    write_dataset(pd.read_csv(csv_path), parquet_path, schema=schema, sort_by=sort_by)
+    return parquet_path
+
+
+def _csv_columns(path, columns, filters):
+    if columns is None:
+        return None
+    filter_columns = [column for column, _, _ in (filters or [])]
+    return list(dict.fromkeys([*columns, *filter_columns]))
+
+
+_OPERATORS = {
+    '==': lambda s, v: s == v, '=': lambda s, v: s == v, '!=': lambda s, v: s != v,
+    '<': lambda s, v: s < v, '<=': lambda s, v: s <= v, '>': lambda s, v: s > v, '>=': lambda s, v: s >= v,
+    'in': lambda s, v: s.isin(v), 'not in': lambda s, v: ~s.isin(v),
+}
+
+
+def _filter_frame(df, filters):
+    """
+    Applies a flat list of (column, operator, value) filters, combined with AND.
+
+    """
+    if not filters:
+        return df
+    mask = pd.Series(True, index=df.index)
+    for column, operator, value in filters:
+        mask &= _OPERATORS[operator](df[column], value).fillna(False).astype(bool)
+    return df[mask].reset_index(drop=True)
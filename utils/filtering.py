@@ -0,0 +1,138 @@
+import re
+import pandas as pd
+
+
+# ------------------------------
+# Keyword Matching Functions
+# ------------------------------
+
+def _trie_pattern(words):
+    """
+    Builds a prefix-factored regex alternation from a trie of the words, so the regex engine
+    walks shared prefixes once instead of trying every keyword at every position.
+
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True # end of word
+
+    def build(node):
+        ends_here = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char != '']
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if ends_here:
+            return '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+
+def compile_keyword_pattern(words):
+    """
+    Compiles a case-insensitive pattern matching any of the words as whole words
+    (same matches as joining rf'\b{word}\b' alternatives).
+
+    """
+    words = sorted({word.lower() for word in words})
+    return re.compile(r'\b' + _trie_pattern(words) + r'\b', re.IGNORECASE)
+
+
+def keyword_mask(texts, words, pattern=None):
+    """
+    Returns a boolean Series that is True where the text contains any of the words.
+
+    """
+    pattern = pattern or compile_keyword_pattern(words)
+    return texts.astype(object).str.contains(pattern, na=False).astype(bool)
+
+
+def keyword_hits(texts, words):
+    """
+    Counts, per word, how many texts contain it as a whole word. Meant to be run on the rows
+    already flagged by keyword_mask, which keeps it cheap.
+
+    """
+    texts = texts.astype(object)
+    return {
+        word: int(texts.str.contains(rf'\b{re.escape(word)}\b', case=False, na=False).sum())
+        for word in words
+    }
+
+
+# ------------------------------
+# Genre Exclusion Functions
+# ------------------------------
+
+def _genre_set(genres, separator):
+    if isinstance(genres, (list, tuple, set)):
+        return {str(genre).strip().lower() for genre in genres}
+    if isinstance(genres, str):
+        return {genre.strip().lower() for genre in genres.split(separator)}
+    return set()
+
+
+def genre_exclusion_matches(genres, excluded_genres, separator=','):
+    """
+    Returns a Series holding, for every row, the set of excluded genres it contains.
+    Each distinct genre string (or category) is split once, however many rows share it.
+
+    """
+    excluded_genres = {genre.lower() for genre in excluded_genres}
+
+    if isinstance(genres.dtype, pd.CategoricalDtype):
+        per_category = [_genre_set(value, separator) & excluded_genres for value in genres.cat.categories]
+        per_category.append(set()) # code -1 (missing)
+        return pd.Series([per_category[code] for code in genres.cat.codes], index=genres.index)
+
+    if genres.map(lambda value: isinstance(value, (list, tuple, set))).any():
+        return genres.map(lambda value: _genre_set(value, separator) & excluded_genres)
+
+    codes, uniques = pd.factorize(genres)
+    per_value = [_genre_set(value, separator) & excluded_genres for value in uniques]
+    per_value.append(set()) # code -1 (missing)
+    return pd.Series([per_value[code] for code in codes], index=genres.index)
+
+
+def genre_exclusion_mask(genres, excluded_genres, separator=','):
+    """
+    Returns a boolean Series that is True where any of the excluded genres is present.
+
+    """
+    return genre_exclusion_matches(genres, excluded_genres, separator).map(bool).astype(bool)
+
+
+# ------------------------------
+# Combined Filters
+# ------------------------------
+
+def apply_exclusion_filters(
+    df, title_column='title', keywords=None, genre_column='genres', excluded_genres=None, separator=','
+):
+    """
+    Drops rows whose title contains any keyword or whose genres include an excluded genre,
+    indexing the frame once for both rules. Returns the filtered DataFrame and a report
+    {rule: rows hit} (a row can hit several rules) plus the total number of rows removed.
+
+    """
+    keep = pd.Series(True, index=df.index)
+    report = {}
+
+    if excluded_genres:
+        matches = genre_exclusion_matches(df[genre_column], excluded_genres, separator)
+        for genre in sorted(excluded_genres):
+            report[f'genre: {genre}'] = int(matches.map(lambda found: genre.lower() in found).sum())
+        keep &= ~matches.map(bool).astype(bool)
+
+    if keywords:
+        hit = keyword_mask(df[title_column], keywords)
+        for word, count in keyword_hits(df.loc[hit, title_column], keywords).items():
+            report[f'keyword: {word}'] = count
+        keep &= ~hit
+
+    report['rows removed'] = int((~keep).sum())
+    return df[keep], report
@@ -1,12 +1,20 @@
+import os
+import json
+import importlib.metadata
 import pandas as pd
 import re
-import langcodes
 
 
 # ------------------------------
 # Title Cleaning Functions
 # ------------------------------
 
+WHITESPACE_PATTERN = re.compile(r'\s+')
+SPECIAL_CHARS_PATTERN = re.compile(
+    r'[^\w\sàáâäãåçèéêëìíîïñòóôöõùúûüýÿÀÁÂÄÃÅÇÈÉÊËÌÍÎÏÑÒÓÔÖÕÙÚÛÜÝ]' # special chars, keeps Latin chars and spaces
+)
+
+
 def clean_title(title):
     """
     Cleans a single title by removing leading/trailing spaces, normalizing spaces,
@@ -14,22 +22,46 @@ def clean_title(title):
     """
     if isinstance(title, str): 
         title = title.strip()  
-        title = re.sub(r'\s+', ' ', title) 
-        title = re.sub(
-            r'[^\w\sàáâäãåçèéêëìíîïñòóôöõùúûüýÿÀÁÂÄÃÅÇÈÉÊËÌÍÎÏÑÒÓÔÖÕÙÚÛÜÝ]', '', title # remove special chars, keep Latin chars and spaces
-        )
+        title = WHITESPACE_PATTERN.sub(' ', title) 
+        title = SPECIAL_CHARS_PATTERN.sub('', title)
         title = title.lower()  
         return title
     return None  
 
 
-def prepare_clean_titles(df, column_name):
+def clean_titles(titles):
+    """
+    Vectorized clean_title over a whole Series using pandas string methods.
+    Non-string values become None, as in clean_title.
+    """
+    cleaned = (
+        titles.astype(object)
+        .str.strip()
+        .str.replace(WHITESPACE_PATTERN, ' ', regex=True)
+        .str.replace(SPECIAL_CHARS_PATTERN, '', regex=True)
+        .str.lower()
+    )
+    return cleaned.astype(object).where(cleaned.notna(), None)
+
+
+def title_keys(clean_titles_series):
+    """
+    Hashes already cleaned titles to an Int64 key column (missing titles stay <NA>), so dedup
+    and title-based joins can compare integers instead of strings.
+    """
+    hashes = pd.util.hash_pandas_object(clean_titles_series, index=False).to_numpy().view('int64')
+    missing = clean_titles_series.isna().to_numpy()
+    return pd.Series(pd.arrays.IntegerArray(hashes, missing), index=clean_titles_series.index)
+
+
+def prepare_clean_titles(df, column_name, as_key=False):
     """
     Cleans the titles in a specified column of a DataFrame by removing special characters, 
     normalizing spaces, and converting text to lowercase. The cleaned titles are returned 
-    as a pandas Series.
+    as a pandas Series, or as their Int64 hash keys with as_key=True.
     """ 
-    return df[column_name].apply(clean_title)
+    cleaned = clean_titles(df[column_name])
+    return title_keys(cleaned) if as_key else cleaned
 
 
 def clean_and_remove_duplicates(df, column_name='title'):
@@ -39,15 +71,14 @@ def clean_and_remove_duplicates(df, column_name='title'):
     and return the cleaned DataFrame along with the count of rows removed.
     """
 
-    df[column_name] = df[column_name].apply(clean_title)
-    
-    duplicates = df[df[column_name].duplicated(keep=False)]
+    df[column_name] = clean_titles(df[column_name])
+    keys = title_keys(df[column_name]) # compare integer keys instead of strings
     
-    num_duplicates = len(duplicates)
+    num_duplicates = int(keys.duplicated(keep=False).sum())
     print(f'Number of duplicate rows before cleaning: {num_duplicates}')
     
     rows_before = len(df)
-    df = df.drop_duplicates(subset=column_name, keep='first')
+    df = df[~keys.duplicated(keep='first').to_numpy()]
     
     rows_after = len(df)
     rows_removed = rows_before - rows_after
@@ -79,15 +110,73 @@ def clean_genres(df, column_name):
 # Language Functions
 # ------------------------------
 
+LANGUAGE_OVERRIDES = {'cn': 'Cantonese', 'xx': 'Unknown'} # codes langcodes reports as unknown
+LANGUAGE_CACHE_PATH = './data/local/cache/language_names.json'
+
+
+def _lookup_language_name(code):
+    """
+    Returns the langcodes name of a language code, or None if it cannot be resolved
+    (invalid tag, or the language_data package langcodes needs for names is missing).
+    """
+    try:
+        import langcodes # imported on demand so warm runs of resolve_language_names skip it
+        return langcodes.Language.make(code).language_name()
+    except (ImportError, LookupError, ValueError):
+        return None
+
+
 def get_language_name(code):
     """
     Returns the language name based on the provided language code using the langcodes library.
     If the code is invalid, it returns the code itself.
     """
-    try:
-        return langcodes.Language.make(code).language_name()
-    except:
-        return code
+    name = _lookup_language_name(code)
+    return code if name is None else name
+
+
+def _language_cache_versions():
+    versions = {}
+    for package in ('langcodes', 'language_data'):
+        try:
+            versions[package] = importlib.metadata.version(package)
+        except importlib.metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def resolve_language_names(codes, cache_path=LANGUAGE_CACHE_PATH, overrides=None):
+    """
+    Maps a Series of language codes to language names as a categorical Series.
+    Each distinct code is resolved once; resolved names are kept in a JSON table at 'cache_path'
+    (None disables it) so later runs only call langcodes for codes they have not seen.
+    The table records the langcodes and language_data versions and is rebuilt when they change;
+    codes that could not be resolved map to themselves and are not stored, so they are retried.
+    The 'cn' -> Cantonese and 'xx' -> Unknown overrides are applied on top.
+    """
+    overrides = LANGUAGE_OVERRIDES if overrides is None else overrides
+    versions = _language_cache_versions()
+
+    table = {}
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as file:
+            cache = json.load(file)
+        if cache.get('versions') == versions:
+            table = cache.get('names', {})
+
+    unique_codes = [code for code in pd.unique(codes.dropna()) if isinstance(code, str)]
+    missing = [code for code in unique_codes if code not in table]
+    resolved = {code: _lookup_language_name(code) for code in missing}
+    resolved = {code: name for code, name in resolved.items() if name is not None}
+    if resolved:
+        table.update(resolved)
+        if cache_path:
+            os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+            with open(cache_path, 'w', encoding='utf-8') as file:
+                json.dump({'versions': versions, 'names': table}, file, ensure_ascii=False, indent=0, sort_keys=True)
+
+    names = {**table, **overrides}
+    return codes.map({code: names.get(code, code) for code in unique_codes}).astype('category')
 
 
 # ------------------------------
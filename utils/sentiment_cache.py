@@ -0,0 +1,144 @@
+import os
+import hashlib
+import sqlite3
+import weakref
+
+
+# ------------------------------
+# Sentiment Score Cache
+# ------------------------------
+# Scores are stored in a local SQLite file, keyed by a hash of the normalized text
+# plus the analyzer version, so a changed lexicon never serves stale scores.
+
+CACHE_COLUMNS = ('neg', 'neu', 'pos', 'compound')
+
+_MAX_SQL_VARIABLES = 900 # stay below SQLite's bound-parameter limit
+COMMIT_EVERY = 10000 # rows written with commit=False are committed in batches of this size
+
+_versions = weakref.WeakKeyDictionary() # analyzer -> version, so the lexicon is hashed once per analyzer
+
+
+class CacheConnection(sqlite3.Connection):
+    """
+    SQLite connection that counts the score rows written but not yet committed.
+
+    """
+    pending = 0
+
+
+def open_cache(path):
+    """
+    Opens (or creates) the SQLite score cache at the given path and returns the connection.
+
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(path, factory=CacheConnection)
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS scores ('
+        'key BLOB PRIMARY KEY, neg REAL, neu REAL, pos REAL, compound REAL'
+        ') WITHOUT ROWID'
+    )
+    conn.commit()
+    return conn
+
+
+def analyzer_version(analyzer):
+    """
+    Returns a short fingerprint of the analyzer: its class plus a hash of the loaded lexicon.
+    Computed once per analyzer instance.
+
+    """
+    try:
+        return _versions[analyzer]
+    except (KeyError, TypeError): # TypeError: analyzer cannot be weakly referenced
+        pass
+
+    lexicon = getattr(analyzer, 'lexicon_file', '')
+    digest = hashlib.blake2b(str(lexicon).encode('utf-8'), digest_size=8).hexdigest()
+    version = f'{type(analyzer).__name__}:{digest}'
+    try:
+        _versions[analyzer] = version
+    except TypeError:
+        pass
+    return version
+
+
+def normalize_text(text):
+    """
+    Collapses whitespace runs, which VADER ignores, so equivalent texts share a cache key.
+
+    """
+    return ' '.join(text.split())
+
+
+def make_keys(texts, version):
+    """
+    Builds the 16-byte cache key for each text under the given analyzer version.
+
+    """
+    prefix = f'{version}\0'.encode('utf-8')
+    return [
+        hashlib.blake2b(prefix + normalize_text(text).encode('utf-8'), digest_size=16).digest()
+        for text in texts
+    ]
+
+
+def lookup_scores(conn, keys):
+    """
+    Returns a dictionary {key: (neg, neu, pos, compound)} for the keys found in the cache.
+
+    """
+    found = {}
+    keys = list(keys)
+    for start in range(0, len(keys), _MAX_SQL_VARIABLES):
+        batch = keys[start:start + _MAX_SQL_VARIABLES]
+        placeholders = ', '.join('?' * len(batch))
+        rows = conn.execute(
+            f'SELECT key, neg, neu, pos, compound FROM scores WHERE key IN ({placeholders})', batch
+        )
+        for key, *scores in rows:
+            found[key] = tuple(scores)
+    return found
+
+
+def store_scores(conn, keys, scores, commit=True):
+    """
+    Writes scores to the cache. 'scores' is a dictionary of equally long sequences,
+    one per polarity component. With commit=False (for many small writes, e.g. one text at
+    a time) the rows are committed once COMMIT_EVERY of them are pending; call commit_pending
+    (or close_cache) at the end so the last ones are kept.
+
+    """
+    keys = list(keys)
+    rows = zip(keys, *(scores[column] for column in CACHE_COLUMNS))
+    conn.executemany(
+        'INSERT OR REPLACE INTO scores (key, neg, neu, pos, compound) VALUES (?, ?, ?, ?, ?)',
+        ((key, *map(float, values)) for key, *values in rows)
+    )
+    pending = getattr(conn, 'pending', None) # None: not opened with open_cache, so commit right away
+    if commit or pending is None or pending + len(keys) >= COMMIT_EVERY:
+        commit_pending(conn)
+    else:
+        conn.pending = pending + len(keys)
+
+
+def commit_pending(conn):
+    """
+    Commits the scores written with commit=False.
+
+    """
+    conn.commit()
+    if isinstance(conn, CacheConnection):
+        conn.pending = 0
+
+
+def close_cache(conn):
+    """
+    Commits pending scores and closes the cache connection.
+
+    """
+    commit_pending(conn)
+    conn.close()
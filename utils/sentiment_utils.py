@@ -1,31 +1,78 @@
 import pandas as pd
+import numpy as np
 import plotly.express as px
 from sklearn.feature_extraction.text import CountVectorizer
-from scipy.stats import spearmanr
+from scipy.stats import rankdata
 import re
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 from nltk.sentiment import SentimentIntensityAnalyzer
 from collections import Counter
+from functools import lru_cache
+import os
+from concurrent.futures import ProcessPoolExecutor
+import sentiment_cache
 
 
 # -------------------------
 # Text Preprocessing Functions
 # -------------------------
 
+NON_ALPHA_PATTERN = re.compile(r'[^a-z\s]')
+
+# fused forms the Treebank tokenizer still splits on letters-only text
+_TREEBANK_SPLITS = re.compile(r'\b(can)(not)\b|\b(gim)(me)\b|\b(gon)(na)\b|\b(got)(ta)\b|\b(lem)(me)\b|\b(wan)(na)\b')
+
+
+@lru_cache(maxsize=None)
+def get_stop_words(language='english'):
+    """
+    Returns the NLTK stopword set for a language, read from the corpus once per session.
+
+    """
+    return frozenset(stopwords.words(language))
+
+
+def tokenize(text):
+    """
+    Tokenizes text. Text already normalized to lowercase letters and whitespace takes a fast
+    whitespace split (giving the same tokens as word_tokenize); anything else goes through word_tokenize.
+
+    """
+    if NON_ALPHA_PATTERN.search(text) is None:
+        text = _TREEBANK_SPLITS.sub(lambda match: ' '.join(group for group in match.groups() if group), text)
+        return text.split()
+    return word_tokenize(text)
+
+
 def preprocess_text(text):
     """
     Preprocesses text by lowercasing, removing punctuation, tokenizing, and removing stopwords.
 
     """
-    text = text.lower()
-    text = re.sub(r'[^a-z\s]', '', text)
-    tokens = word_tokenize(text) # tokenize
-    stop_words = set(stopwords.words('english')) # remove stopwords
+    text = NON_ALPHA_PATTERN.sub('', text.lower())
+    tokens = tokenize(text) # tokenize
+    stop_words = get_stop_words() # remove stopwords
     tokens = [word for word in tokens if word not in stop_words]
     return tokens
 
 
+def preprocess_series(texts):
+    """
+    Preprocesses a whole Series at once: vectorized lowercasing and punctuation removal,
+    then tokenizing and stopword removal. Non-string values give an empty token list.
+
+    """
+    texts = pd.Series(texts)
+    is_text = texts.map(lambda x: isinstance(x, str)).astype(bool)
+    normalized = texts.where(is_text).astype(object).str.lower().str.replace(NON_ALPHA_PATTERN, '', regex=True)
+
+    stop_words = get_stop_words()
+    return normalized.map(
+        lambda text: [word for word in tokenize(text) if word not in stop_words] if isinstance(text, str) else []
+    )
+
+
 def explode_column(df, column, separator=','):
     """
     Splits the specified column by a separator and explodes the values into separate rows.
@@ -55,24 +102,172 @@ def explode_column_from_string(df, column, separator=','):
 # Sentiment Analysis Functions
 # ------------------------
 
-def get_sentiment_score(text):
-    """Calculates the sentiment score for a given text."""
-    
-    sia = SentimentIntensityAnalyzer()
+POLARITY_COMPONENTS = ('neg', 'neu', 'pos', 'compound')
+
+_analyzer = None
+
+
+def get_analyzer():
+    """
+    Returns the shared SentimentIntensityAnalyzer, loading the VADER lexicon on first use only.
+
+    """
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+
+def get_sentiment_score(text, analyzer=None, cache=None):
+    """Calculates the sentiment score for a given text, consulting the score cache if one is given.
+    New scores are committed in batches: call sentiment_cache.commit_pending(cache) when done."""
     
     if isinstance(text, str):
-        return sia.polarity_scores(text)['compound']
+        return float(_score_unique_texts([text], analyzer=analyzer, cache=cache, commit=False)['compound'][0])
     return 0  # 0 for non-string values
 
 
-def add_sentiment_columns(df, columns):
+def _score_texts(texts, sia):
+    """
+    Scores a list of strings and returns a dictionary of arrays, one per polarity component.
+
+    """
+    scores = {component: np.zeros(len(texts), dtype='float64') for component in POLARITY_COMPONENTS}
+    for i, text in enumerate(texts):
+        polarity = sia.polarity_scores(text)
+        for component in POLARITY_COMPONENTS:
+            scores[component][i] = polarity[component]
+    return scores
+
+
+def _init_worker(analyzer=None):
+    """
+    Process pool initializer: gives each worker its own analyzer.
+
+    """
+    global _analyzer
+    _analyzer = analyzer if analyzer is not None else SentimentIntensityAnalyzer()
+
+
+def _score_chunk(texts):
+    """
+    Scores one chunk of texts inside a worker.
+
+    """
+    return _score_texts(texts, _analyzer)
+
+
+def _score_texts_parallel(texts, analyzer=None, n_jobs=None, chunk_size=10000):
+    """
+    Splits the texts into chunks, scores them in a process pool and
+    reassembles the results in the original order.
+
+    """
+    chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+    if not chunks:
+        return _score_texts([], analyzer)
+
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(analyzer,)) as executor:
+        results = list(executor.map(_score_chunk, chunks)) # map keeps chunk order
+
+    return {
+        component: np.concatenate([result[component] for result in results])
+        for component in POLARITY_COMPONENTS
+    }
+
+
+def _score_unique_texts(unique_texts, analyzer=None, cache=None, n_jobs=1, chunk_size=10000, commit=True):
+    """
+    Scores a list of distinct strings, reading what it can from the cache and
+    scoring (and storing) only the misses. 'commit' goes to sentiment_cache.store_scores.
+
+    """
+    def score(texts):
+        if n_jobs == 1:
+            return _score_texts(texts, analyzer if analyzer is not None else get_analyzer())
+        return _score_texts_parallel(texts, analyzer=analyzer, n_jobs=n_jobs, chunk_size=chunk_size)
+
+    if cache is None:
+        return score(unique_texts)
+
+    sia = analyzer if analyzer is not None else get_analyzer()
+    keys = sentiment_cache.make_keys(unique_texts, sentiment_cache.analyzer_version(sia))
+    cached = sentiment_cache.lookup_scores(cache, keys)
+
+    missing = [i for i, key in enumerate(keys) if key not in cached]
+    new_scores = score([unique_texts[i] for i in missing])
+    if missing:
+        sentiment_cache.store_scores(cache, [keys[i] for i in missing], new_scores, commit=commit)
+
+    scores = {component: np.zeros(len(unique_texts), dtype='float64') for component in POLARITY_COMPONENTS}
+    for i, key in enumerate(keys):
+        if key in cached:
+            for j, component in enumerate(POLARITY_COMPONENTS):
+                scores[component][i] = cached[key][j]
+    for component in POLARITY_COMPONENTS:
+        scores[component][missing] = new_scores[component]
+    return scores
+
+
+def _expand_scores(texts, positions, unique_scores):
+    """
+    Maps the scores of the distinct texts back onto the full sequence (0 for non-strings).
+
+    """
+    index = np.array([positions.get(text, -1) if isinstance(text, str) else -1 for text in texts], dtype='int64')
+    scores = {}
+    for component in POLARITY_COMPONENTS:
+        padded = np.append(unique_scores[component], 0.0) # index -1 picks the trailing 0
+        scores[component] = padded[index]
+    return scores
+
+
+def score_batch(texts, analyzer=None, cache=None):
+    """
+    Scores a sequence of texts with a single analyzer and returns a dictionary of NumPy arrays,
+    one per polarity component ('neg', 'neu', 'pos', 'compound').
+    Each distinct text is scored once; with a cache (see sentiment_cache.open_cache)
+    texts scored in earlier runs are not scored again. Non-string values score 0 on every component.
+
+    """
+    texts = list(texts)
+    positions = {}
+    for text in texts:
+        if isinstance(text, str) and text not in positions:
+            positions[text] = len(positions)
+
+    unique_scores = _score_unique_texts(list(positions), analyzer=analyzer, cache=cache)
+    return _expand_scores(texts, positions, unique_scores)
+
+
+def add_sentiment_columns(
+    df, columns, analyzer=None, components=('compound',), n_jobs=1, chunk_size=10000, cache=None
+):
     """
     Adds sentiment score columns to the DataFrame for each specified text column.
+    The compound score goes to 'sentiment_<column>', any other requested component
+    to 'sentiment_<column>_<component>'.
+    Distinct texts across all columns are scored once. With n_jobs > 1 (or None for all cores)
+    they are scored in chunks of 'chunk_size' across a process pool; the result is identical
+    to the serial path. With a cache, only texts missing from it are scored.
     
     """
-    for column in columns:
-        sentiment_column_name = f'sentiment_{column}'
-        df[sentiment_column_name] = df[column].apply(get_sentiment_score)
+    values = {column: df[column].tolist() for column in columns}
+    positions = {}
+    for texts in values.values():
+        for text in texts:
+            if isinstance(text, str) and text not in positions:
+                positions[text] = len(positions)
+
+    unique_scores = _score_unique_texts(
+        list(positions), analyzer=analyzer, cache=cache, n_jobs=n_jobs, chunk_size=chunk_size
+    )
+
+    for column, texts in values.items():
+        scores = _expand_scores(texts, positions, unique_scores)
+        for component in components:
+            sentiment_column_name = f'sentiment_{column}' if component == 'compound' else f'sentiment_{column}_{component}'
+            df[sentiment_column_name] = scores[component]
     
     return df
 
@@ -87,59 +282,265 @@ def calculate_overall_sentiment(df, sentiment_columns, new_column_name='overall_
     return df
 
 
+# ------------------------
+# Per-Film Scoring and Faceted Sentiment
+# ------------------------
+
+def score_films(df, columns, id_column='tmdb_id', **scoring_kwargs):
+    """
+    Scores the text columns of each film once (one row per 'id_column') and returns
+    a DataFrame with the id and the sentiment columns only, ready to be joined onto
+    exploded frames with attach_scores. Extra keyword arguments go to add_sentiment_columns.
+
+    """
+    films = df.drop_duplicates(subset=id_column)[[id_column, *columns]].copy()
+    films = add_sentiment_columns(films, columns, **scoring_kwargs)
+    return films.drop(columns=columns).reset_index(drop=True)
+
+
+def attach_scores(df, scores, id_column='tmdb_id'):
+    """
+    Joins per-film scores (from score_films) onto a frame by film id, keeping the frame's
+    row order and index. Works on the original frame or after any number of explodes.
+
+    """
+    return df.join(scores.set_index(id_column), on=id_column)
+
+
+def faceted_sentiment(df, facet_column, sentiment_columns, separator=',', aggs=('mean', 'median', 'count')):
+    """
+    Aggregates sentiment columns per facet value (e.g. genre, language, event) straight from
+    the unexploded frame: only the facet column is split, the scores are gathered by position.
+    Facet values are stripped and empty ones are skipped.
+
+    """
+    if isinstance(sentiment_columns, str):
+        sentiment_columns = [sentiment_columns]
+
+    facets = df[facet_column].reset_index(drop=True)
+    facets = facets.map(lambda x: x.split(separator) if isinstance(x, str) else x).explode()
+    facets = facets.dropna().astype(str).str.strip()
+    facets = facets[facets != '']
+
+    positions = facets.index.to_numpy()
+    values = pd.DataFrame(df[sentiment_columns].to_numpy()[positions], columns=sentiment_columns)
+    values[facet_column] = facets.to_numpy()
+
+    return values.groupby(facet_column)[sentiment_columns].agg(list(aggs))
+
+
 # ---------------------------
 # Correlation and Word Analysis
 # ---------------------------
 
-def word_rating_correlation(df, text_column, rating_column, top_n=10):
+def _sparse_column_ranks(x):
+    """
+    Ranks every column of a non-negative sparse matrix (average ranks for ties) without densifying it.
+    Returns a CSC matrix holding, for the stored entries, the rank minus the shared rank of the
+    column's zeros, plus the sum of squared deviations of the ranks per column.
+
+    """
+    x = x.tocsc()
+    x.sort_indices()
+    n_rows = x.shape[0]
+    counts = np.diff(x.indptr)
+    n_zeros = n_rows - counts
+    zero_rank = (n_zeros + 1) / 2
+
+    cols = np.repeat(np.arange(x.shape[1]), counts)
+    order = np.lexsort((x.data, cols)) # by column, then value
+    sorted_cols = cols[order]
+    sorted_data = x.data[order]
+
+    ordinal = np.arange(len(order)) - x.indptr[sorted_cols] + 1 # 1-based position within column
+    starts = np.flatnonzero(np.r_[True, (sorted_cols[1:] != sorted_cols[:-1]) | (sorted_data[1:] != sorted_data[:-1])])
+    sizes = np.diff(np.r_[starts, len(order)])
+    average = np.repeat(ordinal[starts] + (sizes - 1) / 2, sizes) # average rank within each tie group
+
+    ranks = np.empty(len(order), dtype='float64')
+    ranks[order] = n_zeros[sorted_cols] + average
+
+    mean_rank = (n_rows + 1) / 2
+    sum_sq = n_zeros * (zero_rank - mean_rank) ** 2 + np.bincount(cols, weights=(ranks - mean_rank) ** 2, minlength=x.shape[1])
+    shifted = x.copy().astype('float64')
+    shifted.data = ranks - zero_rank[cols]
+    return shifted, sum_sq
+
+
+def word_rating_correlations(texts, ratings, method='spearman', min_df=1, top_n=None):
+    """
+    Correlates the frequency of every word with the ratings in one vectorized pass over the sparse
+    document-term matrix ('spearman', 'pearson', or 'pointbiserial' for word presence).
+    Rows with a missing rating are ignored and words found in fewer than 'min_df' documents are skipped.
+    Returns a DataFrame ('word', 'correlation') sorted by absolute correlation, limited to 'top_n' rows.
+
+    """
+    texts = pd.Series(texts).reset_index(drop=True)
+    ratings = pd.to_numeric(pd.Series(ratings).reset_index(drop=True), errors='coerce')
+    valid = ratings.notna().to_numpy()
+    texts, y = texts[valid], ratings[valid].to_numpy(dtype='float64')
+
+    vectorizer = CountVectorizer(min_df=min_df) # vectorize text column
+    x = vectorizer.fit_transform(texts)
+    words = vectorizer.get_feature_names_out()
+    n_rows = x.shape[0]
+
+    if method == 'spearman':
+        y = rankdata(y)
+        shifted, var_x = _sparse_column_ranks(x)
+        numerator = shifted.T @ (y - y.mean())
+    elif method in ('pearson', 'pointbiserial'):
+        x = x.tocsc().astype('float64')
+        if method == 'pointbiserial':
+            x.data[:] = 1.0
+        numerator = x.T @ (y - y.mean())
+        col_mean = np.asarray(x.sum(axis=0)).ravel() / n_rows
+        deviations = x.copy()
+        deviations.data = (x.data - np.repeat(col_mean, np.diff(x.indptr))) ** 2
+        var_x = (n_rows - np.diff(x.indptr)) * col_mean ** 2 + np.asarray(deviations.sum(axis=0)).ravel()
+    else:
+        raise ValueError(f"Unknown method '{method}'. Use 'spearman', 'pearson' or 'pointbiserial'.")
+
+    var_y = ((y - y.mean()) ** 2).sum()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corrs = np.where((var_x > 1e-12) & (var_y > 0), numerator / np.sqrt(var_x * var_y), np.nan)
+
+    strength = np.nan_to_num(np.abs(corrs), nan=-1.0)
+    candidates = np.arange(len(corrs))
+    if top_n is not None and top_n < len(corrs):
+        candidates = np.argpartition(-strength, top_n - 1)[:top_n]
+    candidates = candidates[np.lexsort((candidates, -strength[candidates]))] # by |corr|, ties in vocabulary order
+
+    return pd.DataFrame({'word': words[candidates], 'correlation': corrs[candidates]})
+
+
+def plot_word_correlations(correlations, title=None, yaxis_title='Spearman Correlation'):
+    """
+    Plots a bar chart of word correlations as returned by word_rating_correlations.
+    
+    """
+    title = title or f'Top {len(correlations)} Words Correlated with Ratings'
+    fig = px.bar(x=correlations['word'], y=correlations['correlation'], title=title,
+                 labels={'x': 'Words', 'y': yaxis_title}, color=correlations['correlation'],
+                 color_continuous_scale='Temps_r')
+    fig.update_layout(xaxis_tickangle=-45)
+    fig.show()  
+
+
+def word_rating_correlation(df, text_column, rating_column, top_n=10, method='spearman', min_df=1, plot=True):
     """
     Computes and visualizes the Spearman correlation between word frequencies and ratings.
+    Set plot=False to only print and return the top correlations (e.g. in batch jobs).
     
     """
     df[text_column] = df[text_column].apply(
         lambda x: ' '.join(x) if isinstance(x, list) else str(x) # check dtype
     )
 
-    vectorizer = CountVectorizer() # vectorize text column
-    x = vectorizer.fit_transform(df[text_column])
-    word_count_df = pd.DataFrame(x.toarray(), columns=vectorizer.get_feature_names_out())
-
-    correlations = {}
-    for word in word_count_df.columns:
-        corr, _ = spearmanr(word_count_df[word], df[rating_column])
-        correlations[word] = corr
-
-    sorted_correlations = sorted(correlations.items(), key=lambda x: abs(x[1]), reverse=True) # correlation by absolute value
+    top_correlated_words = word_rating_correlations(
+        df[text_column], df[rating_column], method=method, min_df=min_df, top_n=top_n
+    )
 
-    top_correlated_words = sorted_correlations[:top_n]
     print("Top Words Correlated with Ratings:")
-    for word, corr in top_correlated_words:
+    for word, corr in top_correlated_words.itertuples(index=False):
         print(f"{word}: {corr:.2f}")
 
-    words, corrs = zip(*top_correlated_words)
-    fig = px.bar(x=words, y=corrs, title=f'Top {top_n} Words Correlated with Ratings',
-                 labels={'x': 'Words', 'y': 'Spearman Correlation'}, color=corrs,
-                 color_continuous_scale='Temps_r')
-    fig.update_layout(xaxis_tickangle=-45)
-    fig.show()  
+    if plot:
+        plot_word_correlations(
+            top_correlated_words,
+            title=f'Top {top_n} Words Correlated with Ratings',
+            yaxis_title=f'{method.capitalize()} Correlation'
+        )
 
+    return top_correlated_words
+
+
+def count_words(texts, chunk_size=10000, counts=None):
+    """
+    Counts preprocessed tokens chunk by chunk, updating a Counter without keeping any token lists.
+    Non-string values are skipped. Pass 'counts' to keep adding to an existing Counter.
+
+    """
+    counts = Counter() if counts is None else counts
+    texts = texts if isinstance(texts, pd.Series) else pd.Series(list(texts), dtype=object)
+
+    for start in range(0, len(texts), chunk_size):
+        for tokens in preprocess_series(texts.iloc[start:start + chunk_size]):
+            counts.update(tokens)
+
+    return counts
+
+
+def _count_words_chunk(texts):
+    """
+    Worker entry point: counts the tokens of one chunk of texts.
 
-def analyze_most_common_words(df, text_column, top_n=50):
+    """
+    return count_words(texts, chunk_size=len(texts) or 1)
+
+
+def merge_word_counts(partial_counts):
+    """
+    Merges partial Counters (e.g. from parallel workers) into one.
+
+    """
+    merged = Counter()
+    for counts in partial_counts:
+        merged.update(counts)
+    return merged
+
+
+def count_words_from_csv(path, text_column, chunk_size=50000, n_jobs=1):
+    """
+    Streams a text column straight from a CSV file in chunks and counts its preprocessed tokens.
+    With n_jobs > 1 (or None for all cores) chunks are counted in a process pool and the partial
+    counts merged; at most two chunks per worker are in flight at a time.
+
+    """
+    reader = pd.read_csv(path, usecols=[text_column], chunksize=chunk_size)
+
+    if n_jobs == 1:
+        counts = Counter()
+        for chunk in reader:
+            count_words(chunk[text_column], chunk_size=chunk_size, counts=counts)
+        return counts
+
+    max_pending = 2 * (n_jobs or os.cpu_count() or 1)
+    partial_counts = []
+    pending = []
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        for chunk in reader:
+            pending.append(executor.submit(_count_words_chunk, chunk[text_column].tolist()))
+            if len(pending) >= max_pending:
+                partial_counts.append(pending.pop(0).result())
+                partial_counts = [merge_word_counts(partial_counts)] # keep a single running total
+        partial_counts.extend(future.result() for future in pending)
+
+    return merge_word_counts(partial_counts)
+
+
+def analyze_most_common_words(df, text_column, top_n=50, keep_tokens=True, chunk_size=10000):
     """
     Analyzes, visualizes, and prints the most common words in a specified text column,
     with counts and percentages displayed.
+    With keep_tokens=False the column is streamed in chunks and no 'processed_' column is stored.
     """
-    processed_column = f"processed_{text_column}"
-    
-    # Preprocess the text column
-    df[processed_column] = df[text_column].apply(preprocess_text)  # Assumes preprocess_text is defined
-    
-    # Flatten all tokens into a single list
-    all_tokens = [word for tokens in df[processed_column] for word in tokens]
-    total_word_count = len(all_tokens)
+    if keep_tokens:
+        processed_column = f"processed_{text_column}"
+        
+        # Preprocess the text column
+        df[processed_column] = preprocess_series(df[text_column])
+        
+        # Count tokens row by row instead of flattening them into one list
+        word_freq = Counter()
+        for tokens in df[processed_column]:
+            word_freq.update(tokens)
+    else:
+        word_freq = count_words(df[text_column], chunk_size=chunk_size)
+
+    total_word_count = sum(word_freq.values())
     
     # Count the most common words
-    word_freq = Counter(all_tokens)
     most_common_words = word_freq.most_common(top_n)
     
     # Print results
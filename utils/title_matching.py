@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import helpers
+
+
+# ------------------------------
+# Candidate Generation Functions
+# ------------------------------
+
+def _vectorize_titles(left_titles, right_titles, ngram_range=(3, 3)):
+    """
+    Turns both title lists into L2-normalized character n-gram TF-IDF vectors over a shared
+    vocabulary, so a sparse dot product gives their cosine similarity.
+
+    """
+    vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=ngram_range, dtype=np.float32)
+    vectorizer.fit(list(left_titles) + list(right_titles))
+    return vectorizer.transform(left_titles), vectorizer.transform(right_titles)
+
+
+def _top_candidates(similarity, top_k, min_score):
+    """
+    Keeps, for every row of a sparse similarity matrix, the 'top_k' columns scoring at least 'min_score'.
+    Returns (rows, columns, scores) arrays.
+
+    """
+    similarity = similarity.tocoo()
+    keep = similarity.data >= min_score
+    rows, cols, scores = similarity.row[keep], similarity.col[keep], similarity.data[keep]
+
+    order = np.lexsort((cols, -scores, rows)) # by row, best score first
+    rows, cols, scores = rows[order], cols[order], scores[order]
+
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]]) if len(rows) else np.array([], dtype='int64')
+    rank = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+    keep = rank < top_k
+    return rows[keep], cols[keep], scores[keep]
+
+
+def _year_blocks(left_years, right_years, year_tolerance):
+    """
+    Yields (left positions, right positions) for each release year of the left side,
+    pairing it with the right rows released within 'year_tolerance' years.
+
+    """
+    right_order = np.argsort(right_years, kind='stable')
+    sorted_years = right_years[right_order]
+
+    for year in np.unique(left_years):
+        lo = np.searchsorted(sorted_years, year - year_tolerance, side='left')
+        hi = np.searchsorted(sorted_years, year + year_tolerance, side='right')
+        if hi > lo:
+            yield np.flatnonzero(left_years == year), right_order[lo:hi]
+
+
+def match_titles(
+    left, right, left_title='title', right_title='title', left_year=None, right_year=None,
+    year_tolerance=0, min_score=0.8, top_k=3, chunk_size=5000
+):
+    """
+    Finds fuzzy title matches between two frames and returns candidate pairs with their
+    cosine similarity on character trigrams ('left_index', 'right_index', 'score'), best first.
+    With year columns, only films released within 'year_tolerance' years of each other are
+    compared (rows without a year are skipped); without them every pair is scored.
+    Left rows are processed in chunks of 'chunk_size' to bound memory.
+
+    """
+    left_clean = helpers.clean_titles(left[left_title])
+    right_clean = helpers.clean_titles(right[right_title])
+    left_valid = left_clean.notna().to_numpy()
+    right_valid = right_clean.notna().to_numpy()
+
+    if left_year is not None and right_year is not None:
+        left_years = pd.to_numeric(left[left_year], errors='coerce').astype('float64').to_numpy()
+        right_years = pd.to_numeric(right[right_year], errors='coerce').astype('float64').to_numpy()
+        left_valid &= ~np.isnan(left_years)
+        right_valid &= ~np.isnan(right_years)
+    else:
+        left_years = np.zeros(len(left))
+        right_years = np.zeros(len(right))
+
+    left_positions = np.flatnonzero(left_valid)
+    right_positions = np.flatnonzero(right_valid)
+    left_vectors, right_vectors = _vectorize_titles(
+        left_clean.iloc[left_positions].tolist(), right_clean.iloc[right_positions].tolist()
+    )
+
+    pairs = []
+    blocks = _year_blocks(left_years[left_positions], right_years[right_positions], year_tolerance)
+    for left_block, right_block in blocks:
+        right_matrix = right_vectors[right_block].T.tocsc()
+        for start in range(0, len(left_block), chunk_size):
+            rows_in_chunk = left_block[start:start + chunk_size]
+            similarity = left_vectors[rows_in_chunk] @ right_matrix
+            rows, cols, scores = _top_candidates(similarity, top_k, min_score)
+            pairs.append(pd.DataFrame({
+                'left_index': left.index[left_positions[rows_in_chunk[rows]]],
+                'right_index': right.index[right_positions[right_block[cols]]],
+                'score': scores.astype('float64'),
+            }))
+
+    if not pairs:
+        return pd.DataFrame({'left_index': [], 'right_index': [], 'score': []})
+
+    matches = pd.concat(pairs, ignore_index=True)
+    return matches.sort_values(['left_index', 'score'], ascending=[True, False], kind='stable').reset_index(drop=True)
+
+
+# ------------------------------
+# Id Resolution Functions
+# ------------------------------
+
+def best_matches(left, right, min_score=0.9, **match_kwargs):
+    """
+    Returns the single best candidate per left row ('left_index', 'right_index', 'score').
+
+    """
+    matches = match_titles(left, right, min_score=min_score, top_k=1, **match_kwargs)
+    return matches.drop_duplicates(subset='left_index', keep='first').reset_index(drop=True)
+
+
+def resolve_ids(left, right, columns, min_score=0.9, **match_kwargs):
+    """
+    Fills the given columns of 'left' (e.g. 'tmdb_id', or 'doesthedog_id' and 'topics') from the
+    best fuzzy title match in 'right', only where they are still missing. Lets ids be linked
+    locally instead of with one search request per title. Returns the updated frame and the matches.
+
+    """
+    matches = best_matches(left, right, min_score=min_score, **match_kwargs)
+
+    for column in columns:
+        found = right.loc[matches['right_index'], column].set_axis(matches['left_index']).reindex(left.index)
+        if column not in left.columns:
+            left[column] = found
+        else:
+            left[column] = left[column].where(left[column].notna(), found)
+
+    return left, matches